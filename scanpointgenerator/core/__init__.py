@@ -9,11 +9,13 @@
 ###
 
 from .random import Random
-from .point import Point, Points
+from .point import Point, Points, PointsBuilder
 from .roi import ROI
+from .packedmask import PackedMask
 from .mutator import Mutator
 from .excluder import Excluder, AExcluderAxes, UExcluderAxes
 from .generator import Generator, AAxes, AUnits, AAlternate, ASize, UAxes, \
     UUnits
+from .preparecache import PrepareCache
 from .compoundgenerator import CompoundGenerator
 from .dimension import Dimension
@@ -9,7 +9,9 @@
 #
 ###
 
+import json
 import logging
+import os
 
 from annotypes import Serializable, Anno, Union, Array, Sequence, \
     deserialize_object
@@ -21,6 +23,7 @@ from scanpointgenerator.core.point import Point, Points
 from scanpointgenerator.core.excluder import Excluder
 from scanpointgenerator.excluders.roiexcluder import ROIExcluder
 from scanpointgenerator.core.mutator import Mutator
+from scanpointgenerator.core.preparecache import prepare_key
 from scanpointgenerator.rois import RectangularROI
 from scanpointgenerator.generators import LineGenerator, StaticPointGenerator
 
@@ -40,6 +43,24 @@ with Anno("Make points continuous (set upper/lower bounds)"):
 with Anno("Time delay after each point"):
     ADelay = float
 
+def _map(function, items, workers):
+    """Apply function to each item, using a pool of threads if workers > 1"""
+    if workers > 1 and len(items) > 1:
+        # imported here as multiprocessing is not available on all platforms
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(workers, len(items)))
+        try:
+            return pool.map(function, items)
+        finally:
+            pool.close()
+            pool.join()
+    return [function(item) for item in items]
+
+
+# Version of the directory layout written by save_prepared
+PREPARED_FORMAT_VERSION = 1
+PREPARED_META_FILE = "prepared.json"
+
 
 @Generator.register_subclass(
     "scanpointgenerator:generator/CompoundGenerator:1.0")
@@ -47,6 +68,10 @@ class CompoundGenerator(Serializable):
     """Nest N generators, apply exclusion regions to relevant generator pairs
     and apply any mutators before yielding points"""
 
+    prepare_cache = None
+    """PrepareCache: Opt-in cache of prepared state shared between identical
+    scans. None disables caching"""
+
     def __init__(self,
                  generators,  # type: UGenerators
                  excluders=(),  # type: UExcluders
@@ -92,17 +117,226 @@ class CompoundGenerator(Serializable):
             raise ValueError("Axis names cannot be duplicated")
 
 
-    def prepare(self):
+    def prepare(self, lazy=False, streaming=False, memmap=False,
+                memmap_dir=None, workers=1, mask_workers=1,
+                mask_block_size=None, compress=False):
         """
         Prepare data structures required for point generation and
         initialize size, shape, and dimensions attributes.
         Must be called before get_point or iterator are called.
+
+        Args:
+            lazy (bool): Compute positions of unmasked dimensions on access
+                rather than storing every point (see Dimension.prepare)
+            streaming (bool): Mask dimensions slice by slice so that memory
+                use depends on the number of valid points rather than the
+                size of the unmasked product (see Dimension.prepare)
+            memmap (bool): Store dimension positions and bounds in
+                memory-mapped temporary files rather than in memory
+            memmap_dir (str): Directory for the memory-mapped files, or None
+                to use the default temporary directory
+            workers (int): Number of threads used to prepare generators and
+                independent dimensions concurrently
+            mask_workers (int): Number of processes used to create each
+                excluder mask (see Dimension.prepare)
+            mask_block_size (int): Number of points masked at a time by each
+                mask worker process
+            compress (bool): Store the valid points of each dimension as
+                runs of consecutive points of the unmasked product, and
+                compute positions on access (see Dimension.prepare)
         """
         if self._prepared:
             return
-        self.dimensions = []
+        cache = self.prepare_cache
+        if cache is not None:
+            key = self._prepare_key(
+                lazy=lazy, streaming=streaming, memmap=memmap,
+                memmap_dir=memmap_dir, compress=compress)
+            state = cache.get(key)
+            if state is not None:
+                # the cached dimensions hold another instance's generators,
+                # so prepare this instance's as _create_dimensions would
+                _map(lambda g: g.prepare_positions(), self.generators, workers)
+                if self.continuous:
+                    self.generators[-1].prepare_bounds()
+                dimensions, dim_meta = state
+                self.dimensions = list(dimensions)
+                self._dim_meta = {d:dict(dim_meta[d]) for d in dim_meta}
+                self.shape = tuple(dim.size for dim in self.dimensions)
+                self.size = 1
+                for dim in self.dimensions:
+                    self.size *= dim.size
+                self._compile_plan()
+                self._prepared = True
+                return
+        self._create_dimensions(workers)
         self._dim_meta = {}
 
+        def prepare_dimension(dim):
+            dim.prepare(lazy=lazy, streaming=streaming, memmap=memmap,
+                        memmap_dir=memmap_dir, mask_workers=mask_workers,
+                        mask_block_size=mask_block_size, compress=compress)
+
+        _map(prepare_dimension, self.dimensions, workers)
+        self.size = 1
+        for dim in self.dimensions:
+            self._dim_meta[dim] = {}
+            if dim.size == 0:
+                raise ValueError("Regions would exclude entire scan")
+            self.size *= dim.size
+
+        self.shape = tuple(dim.size for dim in self.dimensions)
+        repeat = self.size
+        tile = 1
+        for dim in self.dimensions:
+            repeat /= dim.size
+            # Tile = number of times this dimension is tiled
+            self._dim_meta[dim]["tile"] = tile
+            # Repeat = number of times each point is repeated
+            self._dim_meta[dim]["repeat"] = repeat
+            tile *= dim.size
+
+        if cache is not None:
+            cache.put(key, (
+                tuple(self.dimensions),
+                {d:dict(self._dim_meta[d]) for d in self._dim_meta}))
+        self._compile_plan()
+        self._prepared = True
+
+
+    def save_prepared(self, path):
+        """
+        Save the prepared dimensions to a directory of uncompressed .npy
+        files, so that another process can call load_prepared rather than
+        preparing the same scan again.
+
+        Args:
+            path (str): Directory to save to, created if it does not exist
+        """
+        if not self._prepared:
+            raise ValueError("CompoundGenerator has not been prepared")
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        dimensions = []
+        for i, dim in enumerate(self.dimensions):
+            bounds = []
+            for j, axis in enumerate(dim.axes):
+                name = os.path.join(path, "dim%d_axis%d_" % (i, j))
+                np.save(name + "positions.npy", np.asarray(dim.positions[axis]))
+                if dim.lower_bounds[axis] is not dim.positions[axis]:
+                    np.save(name + "lower.npy", np.asarray(dim.lower_bounds[axis]))
+                    np.save(name + "upper.npy", np.asarray(dim.upper_bounds[axis]))
+                    bounds.append(axis)
+            if dim.indices is not None:
+                np.save(os.path.join(path, "dim%d_indices.npy" % i),
+                        np.asarray(dim.indices))
+            dimensions.append(dict(
+                axes=list(dim.axes),
+                size=dim.size,
+                bounds=bounds,
+                indices=dim.indices is not None,
+                repeat=self._dim_meta[dim]["repeat"],
+                tile=self._dim_meta[dim]["tile"]))
+        # written last so that an incomplete save cannot be loaded
+        with open(os.path.join(path, PREPARED_META_FILE), "w") as f:
+            json.dump(dict(
+                version=PREPARED_FORMAT_VERSION,
+                key=self._prepare_key(),
+                dimensions=dimensions), f)
+
+    def load_prepared(self, path, mmap_mode="r"):
+        """
+        Load dimensions saved by save_prepared for an identical scan. This
+        may be called instead of prepare.
+
+        Args:
+            path (str): Directory written by save_prepared
+            mmap_mode (str): Memory-map mode passed to numpy.load, or None
+                to read the arrays into memory
+        Raises:
+            ValueError: If the directory was saved by a different version
+                or for a different scan
+        """
+        if self._prepared:
+            return
+        with open(os.path.join(path, PREPARED_META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get("version") != PREPARED_FORMAT_VERSION:
+            raise ValueError(
+                "Prepared scan in %s has format version %s, expected %s" % (
+                    path, meta.get("version"), PREPARED_FORMAT_VERSION))
+        if meta.get("key") != self._prepare_key():
+            raise ValueError(
+                "Prepared scan in %s was saved for a different scan" % path)
+
+        def load(name):
+            return np.load(
+                os.path.join(path, name), mmap_mode=mmap_mode,
+                allow_pickle=False)
+
+        self._create_dimensions()
+        if [d.axes for d in self.dimensions] != \
+                [d["axes"] for d in meta["dimensions"]]:
+            raise ValueError(
+                "Prepared scan in %s does not match the dimensions of this "
+                "scan" % path)
+        self._dim_meta = {}
+        self.size = 1
+        for i, (dim, dim_meta) in enumerate(
+                zip(self.dimensions, meta["dimensions"])):
+            positions, lower, upper = {}, {}, {}
+            for j, axis in enumerate(dim.axes):
+                name = "dim%d_axis%d_" % (i, j)
+                positions[axis] = load(name + "positions.npy")
+                if axis in dim_meta["bounds"]:
+                    lower[axis] = load(name + "lower.npy")
+                    upper[axis] = load(name + "upper.npy")
+                else:
+                    lower[axis] = upper[axis] = positions[axis]
+            indices = None
+            if dim_meta["indices"]:
+                indices = load("dim%d_indices.npy" % i)
+            dim.restore(positions, lower, upper, indices)
+            self._dim_meta[dim] = dict(
+                repeat=dim_meta["repeat"], tile=dim_meta["tile"])
+            self.size *= dim.size
+        self.shape = tuple(dim.size for dim in self.dimensions)
+        self._compile_plan()
+        self._prepared = True
+
+    def _compile_plan(self):
+        """
+        Flatten the prepared dimensions into the tuples get_point walks for
+        every point: (repeat, size, alternate, columns) per dimension, where
+        columns is ((axis, positions, lower_bounds, upper_bounds), ...) for
+        the innermost dimension and ((axis, positions), ...) otherwise.
+        Stored as (outer dimension tuples, innermost dimension tuple)
+        """
+        plan = []
+        for dim in self.dimensions:
+            if dim is self.dimensions[-1]:
+                columns = tuple(
+                    (axis, dim.positions[axis], dim.lower_bounds[axis],
+                     dim.upper_bounds[axis]) for axis in dim.axes)
+            else:
+                columns = tuple(
+                    (axis, dim.positions[axis]) for axis in dim.axes)
+            plan.append((int(self._dim_meta[dim]["repeat"]), dim.size,
+                         bool(dim.alternate), columns))
+        self._plan = (tuple(plan[:-1]), plan[-1])
+
+    def _prepare_key(self, **parameters):
+        return prepare_key(
+            self.generators, self.excluders, continuous=self.continuous,
+            **parameters)
+
+    def _create_dimensions(self, workers=1):
+        """
+        Prepare generator positions and group the generators into unprepared
+        Dimensions, merging any generators that share an excluder
+        """
+        self.dimensions = []
+
         # we're going to mutate these structures
         excluders = list(self.excluders)
         generators = list(self.generators)
@@ -150,8 +384,8 @@ class CompoundGenerator(Serializable):
                     # Remove Excluder as it is now empty
                     excluders.remove(excluder_)
 
+        _map(lambda g: g.prepare_positions(), generators, workers)
         for generator in generators:
-            generator.prepare_positions()
             self.dimensions.append(Dimension([generator]))
         # only the inner-most generator needs to have bounds calculated
         if self.continuous:
@@ -173,48 +407,56 @@ class CompoundGenerator(Serializable):
                 dim = self.dimensions[d_start]
             dim.apply_excluder(excluder)
 
-        self.size = 1
-        for dim in self.dimensions:
-            self._dim_meta[dim] = {}
-            dim.prepare()
-            if dim.size == 0:
-                raise ValueError("Regions would exclude entire scan")
-            self.size *= dim.size
-
-        self.shape = tuple(dim.size for dim in self.dimensions)
-        repeat = self.size
-        tile = 1
-        for dim in self.dimensions:
-            repeat /= dim.size
-            # Tile = number of times this dimension is tiled
-            self._dim_meta[dim]["tile"] = tile
-            # Repeat = number of times each point is repeated
-            self._dim_meta[dim]["repeat"] = repeat
-            tile *= dim.size
-
-        self._prepared = True
 
-
-    def iterator(self):
+    def iterator(self, reuse=False):
         """
         Iterator yielding generator positions at each scan point
 
+        Args:
+            reuse (bool): If True, yield the same Point object filled in with
+                each point in turn, rather than a new Point per scan point.
+                A yielded Point is then only valid until the next is requested
         Yields:
             Point: The next point
         """
         if not self._prepared:
             raise ValueError("CompoundGenerator has not been prepared")
-        it = (self.get_point(n) for n in range_(self.size))
+        point = Point() if reuse else None
+        it = (self.get_point(n, point) for n in range_(self.size))
         for p in it:
             yield p
 
+    def iter_chunks(self, chunk_size, views=False, broadcast=False):
+        """
+        Iterator yielding generator positions in blocks of scan points.
+        Each block is produced by get_points, so at most chunk_size points
+        are held in memory at once.
+
+        Args:
+            chunk_size (int): maximum number of points in each block
+            views (bool), broadcast (bool): passed to get_points
+        Yields:
+            Points: The next block of points
+        """
+        if not self._prepared:
+            raise ValueError("CompoundGenerator has not been prepared")
+        chunk_size = int(chunk_size)
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        for start in range_(0, self.size, chunk_size):
+            yield self.get_points(
+                start, min(start + chunk_size, self.size), views=views,
+                broadcast=broadcast)
+
 
-    def get_point(self, n):
+    def get_point(self, n, point=None):
         """
         Retrieve the desired point from the generator
 
         Args:
             n (int): point to be generated
+            point (Point): Existing Point to clear and fill in rather than
+                allocating a new one
         Returns:
             Point: The requested point
         """
@@ -222,29 +464,39 @@ class CompoundGenerator(Serializable):
             raise ValueError("CompoundGenerator has not been prepared")
         if n >= self.size:
             raise IndexError("Requested point is out of range")
-        point = Point()
+        if point is None:
+            point = Point()
+        else:
+            point.clear()
+        positions, lower, upper = point.positions, point.lower, point.upper
+        indexes = point.indexes
+        n = int(n)
 
         # determine which point to extract from each dimension
         # handling the fact that some dimensions "alternate"
-        for dim in self.dimensions:
-            k = int(n // self._dim_meta[dim]["repeat"])
-
-            dim_runs = k // dim.size
-            dim_idx = k % dim.size
-            dim_in_reverse = dim.alternate and dim_runs % 2 == 1
+        outer, inner = self._plan
+        for repeat, size, alternate, columns in outer:
+            dim_runs, dim_idx = divmod(n // repeat, size)
+            if alternate and dim_runs % 2 == 1:
+                dim_idx = size - dim_idx - 1
+            for axis, axis_positions in columns:
+                positions[axis] = lower[axis] = upper[axis] = \
+                    axis_positions[dim_idx]
+            indexes.append(dim_idx)
+
+        # only the innermost dimension has bounds, swapped when reversed
+        repeat, size, alternate, columns = inner
+        dim_runs, dim_idx = divmod(n // repeat, size)
+        dim_in_reverse = alternate and dim_runs % 2 == 1
+        if dim_in_reverse:
+            dim_idx = size - dim_idx - 1
+        for axis, axis_positions, axis_lower, axis_upper in columns:
+            positions[axis] = axis_positions[dim_idx]
             if dim_in_reverse:
-                dim_idx = dim.size - dim_idx - 1
-
-            dim_positions = dim.get_point(dim_idx)
-            point.positions.update(dim_positions)
-            if dim is self.dimensions[-1]:
-                lower, upper = dim.get_bounds(dim_idx, dim_in_reverse)
-                point.lower.update(lower)
-                point.upper.update(upper)
+                lower[axis], upper[axis] = axis_upper[dim_idx], axis_lower[dim_idx]
             else:
-                point.lower.update(dim_positions)
-                point.upper.update(dim_positions)
-            point.indexes.append(dim_idx)
+                lower[axis], upper[axis] = axis_lower[dim_idx], axis_upper[dim_idx]
+        indexes.append(dim_idx)
 
         point.duration = self.duration
         point.delay_after = self.delay_after
@@ -252,13 +504,24 @@ class CompoundGenerator(Serializable):
             point = m.mutate(point, n)
         return point
 
-    def get_points(self, start, finish):
+    def get_points(self, start, finish, step=None, views=False,
+                   broadcast=False):
         """
         Retrieve a Points object: a wrapper for an array of Point from the generator
 
         Args:
             start (int), finish (int): indices of the first point and final+1th point to include
             i.e. get_points(1, 5) would return a Points of Point 1, 2, 3 & 4 but not 5.
+            step (int): interval between included points, e.g. get_points(0, 10, 3)
+            would include Point 0, 3, 6 & 9. Defaults to 1, or -1 if finish < start
+            views (bool): If True and step is 1, the positions and bounds of
+            axes that step once per point within a single run are read-only
+            views of the dimension arrays rather than copies, unless changed
+            by a mutator. Ignored if a mutator does not implement mutated_axes
+            broadcast (bool): If True, the positions and bounds of axes that do
+            not step are read-only broadcasts of a single value (see
+            Points.is_broadcast) rather than repeated, unless changed by a
+            mutator. Ignored if a mutator does not implement mutated_axes
         Returns:
             Points: a wrapper object with the data of the requested Point [plural]
         """
@@ -280,38 +543,168 @@ class CompoundGenerator(Serializable):
                 => M behaves like all dimensions within it
             innermost dim must be moving
         '''
+        if step is None:
+            step = np.sign(finish-start)
+        elif step == 0:
+            raise ValueError("step cannot be zero")
         if finish == start:
             return Points()
-        indices = np.arange(start, finish, np.sign(finish-start))
+        indices = np.arange(start, finish, step)
+        if not len(indices):
+            return Points()
         indices = np.where(indices < 0, indices + self.size, indices)
         if max(indices) >= self.size:
             raise IndexError("Requested points extend out of range")
+        return self._get_points(
+            indices, views=views and step == 1, broadcast=broadcast)
+
+    def get_points_at(self, indices, broadcast=False):
+        """
+        Retrieve a Points object of the points at any indices, in the order
+        given, e.g. get_points_at([0, 100, 5]) would return a Points of Point
+        0, 100 & 5. Negative indices count back from the end of the scan.
+
+        Args:
+            indices (list(int)): indices of the points to include
+            broadcast (bool): as for get_points
+        Returns:
+            Points: a wrapper object with the data of the requested Point [plural]
+        """
+        if not self._prepared:
+            raise ValueError("CompoundGenerator has not been prepared")
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        if not len(indices):
+            return Points()
+        indices = np.where(indices < 0, indices + self.size, indices)
+        if indices.min() < 0 or indices.max() >= self.size:
+            raise IndexError("Requested points extend out of range")
+        return self._get_points(indices, broadcast=broadcast)
+
+    def _get_points(self, indices, views=False, broadcast=False):
         length = len(indices)
         points = Points()
-
-        for dim in self.dimensions:
+        # Fill one index array rather than stacking a column per dimension
+        indexes = np.empty((length, len(self.dimensions)), dtype=np.int64)
+        # Views and broadcast columns are read-only, so can only be used if
+        # every mutator declares the arrays it changes in place
+        mutated = [m.mutated_axes() for m in self.mutators]
+        in_place = all(axes is not None for axes in mutated)
+        broadcast = broadcast and in_place
+        views = views and in_place
+
+        for i, dim in enumerate(self.dimensions):
             point_repeat = int(self._dim_meta[dim]["repeat"])
             point_indices = indices // point_repeat  # Number of point this step is on
             found_m = np.any(point_indices != point_indices[0]) # For alternating case
-            if found_m:
-                points.extract(self._points_from_below_m(dim, point_indices))
+            dim_points = None
+            if found_m and views and point_repeat == 1:
+                dim_points = self._points_view(dim, point_indices[0], length)
+            if dim_points is not None:
+                points.extract(dim_points, indexes=False, copy=False)
+            elif found_m:
+                dim_points = self._points_from_below_m(dim, point_indices)
+                points.extract(dim_points, indexes=False)
             else:
-                points.extract(self._points_above_m(dim, point_indices[0], length))
+                dim_points = self._points_above_m(
+                    dim, point_indices[0], length, broadcast)
+                points.extract(dim_points, indexes=False, copy=not broadcast)
+            indexes[:, i] = dim_points.indexes
+        points.indexes = indexes[:, 0] if len(self.dimensions) == 1 else indexes
         points.duration = np.full(length, self.duration)
         points.delay_after = np.full(length, self.delay_after)
+        if not in_place:
+            for m in self.mutators:
+                points = m.mutate(points, indices)
+            return points
+        for axes in mutated:
+            for field in axes:
+                arrays = getattr(points, field)
+                for axis in axes[field]:
+                    array = arrays[axis]
+                    if not (array.flags.writeable and array.flags.owndata):
+                        arrays[axis] = array.copy()
         for m in self.mutators:
-            points = m.mutate(points, indices)
+            m.mutate_in_place(points, indices)
         return points
 
+    def get_points_array(self, start, finish):
+        """
+        Retrieve points as a single contiguous structured array, with the
+        column layout described in Points.to_structured and axis fields in
+        the order of self.axes
+
+        Args:
+            start (int), finish (int): indices of the first point and final+1th point to include
+        Returns:
+            np.array: structured array of the requested points, of length
+                zero (with the same fields) if there are none
+        """
+        # the columns are copied into the structured array, so may be views
+        points = self.get_points(start, finish, views=True, broadcast=True)
+        if not len(points):
+            # an empty Points has no axes, so give it empty columns
+            for axis in self.axes:
+                points.positions[axis] = points.lower[axis] = \
+                    points.upper[axis] = np.zeros(0)
+            points.indexes = np.zeros((0, len(self.dimensions)), dtype=np.int64)
+        return points.to_structured(self.axes)
+
     @staticmethod
-    def _points_above_m(dim, index, length):
-        if dim.alternate and ((index // dim.size) % 2 == 1):
+    def _points_above_m(dim, index, length, broadcast=False):
+        reverse = dim.alternate and ((index // dim.size) % 2 == 1)
+        if reverse:
             index = dim.size - index - 1
         index %= dim.size
         ''' This dimension does not step, all points are the same point, cannot be the lowest dimension 
         Unless finish = start + 1, in which case all dimensions are treated this way'''
-        return Points.points_from_axis_point(dim, int(index), length)
+        return Points.points_from_axis_point(
+            dim, int(index), length, broadcast, bool(reverse))
     
+    def _points_view(self, dim, first, length):
+        """
+        Points of consecutive dimension indices within a single run, as
+        read-only views of the dimension arrays rather than copies
+
+        Args:
+            dim (Dimension): Dimension stepping once per point
+            first (int): Dimension step of the first point
+            length (int): Number of points
+        Returns:
+            Points: Points with indexes but no duration or delay, or None if
+                the points do not fall within a single run of dim
+        """
+        dim_run, start = divmod(int(first), dim.size)
+        if start + length > dim.size:
+            return None
+        backwards = dim.alternate and dim_run % 2 == 1
+        if backwards:
+            start = dim.size - start - 1
+            stop = start - length
+            index = slice(start, stop if stop >= 0 else None, -1)
+            dim_indices = np.arange(start, stop, -1)
+        else:
+            index = slice(start, start + length)
+            dim_indices = np.arange(start, start + length)
+
+        def view(array):
+            array = array[index]
+            array.flags.writeable = False
+            return array
+
+        points = Points()
+        points.positions.update({axis: view(dim.positions[axis]) for axis in dim.axes})
+        if dim is self.dimensions[-1]:
+            lower, upper = dim.lower_bounds, dim.upper_bounds
+            if backwards:
+                lower, upper = upper, lower
+            points.lower.update({axis: view(lower[axis]) for axis in dim.axes})
+            points.upper.update({axis: view(upper[axis]) for axis in dim.axes})
+        else:
+            points.lower.update(points.positions)
+            points.upper.update(points.positions)
+        points.indexes = dim_indices
+        return points
+
     def _points_from_below_m(self, dim, indices):
         points = Points()
         '''
@@ -7,8 +7,299 @@
 ###
 
 import itertools
+import tempfile
+from bisect import bisect_right
+
+from scanpointgenerator.compat import range_, np
+from scanpointgenerator.core.packedmask import PackedMask
+from scanpointgenerator.core.parallelmask import MaskPool, MASK_BLOCK_SIZE
+from scanpointgenerator.excluders.roiexcluder import ROIExcluder
+from scanpointgenerator.excluders.squashingexcluder import SquashingExcluder
+
+# Maximum number of points of a merged product to mask at once when streaming
+STREAMING_BLOCK_SIZE = 2 ** 20
+
+
+def _take(source, indices, memmap=False, memmap_dir=None):
+    """
+    Index source by indices, optionally writing the result block by block to
+    a memory-mapped temporary file rather than allocating it in memory
+
+    Args:
+        source (np.array): Array (or array-like) to take values from
+        indices (np.array): Indices of the values to take
+        memmap (bool): Whether to back the result with a temporary file
+        memmap_dir (str): Directory for the temporary file, or None to use
+            the default temporary directory
+    Returns:
+        np.array: source[indices]
+    """
+    if not memmap or len(indices) == 0:
+        return source[indices]
+    # the file is removed when closed, but the mapping keeps it available
+    with tempfile.TemporaryFile(dir=memmap_dir) as f:
+        result = np.memmap(f, dtype=source.dtype, mode="w+",
+                           shape=(len(indices),))
+    for start in range_(0, len(indices), STREAMING_BLOCK_SIZE):
+        stop = start + STREAMING_BLOCK_SIZE
+        result[start:stop] = source[indices[start:stop]]
+    return result
+
+
+def _ragged_ranges(starts, counts, steps=1):
+    """
+    Concatenate ranges of integers, as a cumulative sum of their steps
+
+    Args:
+        starts (np.array): First value of each range
+        counts (np.array): Number of values in each range
+        steps (np.array): Step of each range, or a step shared by all
+    Returns:
+        np.array(int64): The values of each range in turn
+    """
+    nonempty = counts > 0
+    starts, counts = starts[nonempty], counts[nonempty]
+    if len(counts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if np.ndim(steps) == 0:
+        steps = np.full(len(counts), steps, dtype=np.int64)
+        values = np.full(counts.sum(), steps[0], dtype=np.int64)
+    else:
+        steps = steps[nonempty].astype(np.int64)
+        values = np.repeat(steps, counts)
+    # replace the step into the first value of each range by the jump from
+    # the last value of the one before
+    firsts = np.cumsum(counts) - counts
+    values[0] = starts[0]
+    values[firsts[1:]] = \
+        starts[1:] - starts[:-1] - steps[:-1] * (counts[:-1] - 1)
+    return np.cumsum(values)
+
+
+class _ProductAxis(object):
+    """
+    Read-only array-like view of one axis of the unrolled product of a
+    Dimension's generators. Values are computed from the flat index by
+    index arithmetic rather than stored.
+    """
+
+    def __init__(self, forward, reverse, repeat, size, alternate, length):
+        self.forward = forward
+        """np.array: Values for each generator point on a forward run"""
+        self.reverse = reverse
+        """np.array: Values for each generator point on a reversed run"""
+        self.repeat = repeat
+        """int: Number of times each generator point is repeated"""
+        self.size = size
+        """int: Size of the generator"""
+        self.alternate = alternate
+        self.length = length
+        self.dtype = forward.dtype
+        self.shape = (length,)
+        self.ndim = 1
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.length)
+            if step == 1:
+                return self._contiguous(start, max(start, stop))
+            idx = np.arange(start, stop, step)
+        elif isinstance(idx, (int, np.integer)) or np.ndim(idx) == 0:
+            idx = int(idx)
+            if idx < 0:
+                idx += self.length
+            return self._value(idx // self.repeat)
+        else:
+            idx = np.asarray(idx)
+            idx = np.where(idx < 0, idx + self.length, idx)
+        return self._run_values(idx // self.repeat)
+
+    def _value(self, run):
+        # _run_values for a single run, without array operations
+        run, point_idx = divmod(run, self.size)
+        if self.alternate and run % 2 == 1:
+            return self.reverse[self.size - point_idx - 1]
+        return self.forward[point_idx]
+
+    def _run_values(self, run):
+        point_idx = run % self.size
+        if not self.alternate:
+            return self.forward[point_idx]
+        backwards = (run // self.size) % 2 == 1
+        point_idx = np.where(backwards, self.size - point_idx - 1, point_idx)
+        return np.where(
+            backwards, self.reverse[point_idx], self.forward[point_idx])[()]
+
+    def _contiguous(self, start, stop):
+        # Values are constant over runs of `repeat` indices and periodic over
+        # runs, so only evaluate a single period of runs and tile it
+        if start == stop:
+            return self.forward[:0].copy()
+        first_run = start // self.repeat
+        n_runs = (stop - 1) // self.repeat - first_run + 1
+        period = self.size * 2 if self.alternate else self.size
+        values = self._run_values(
+            np.arange(first_run, first_run + min(n_runs, period)))
+        if n_runs > period:
+            values = np.resize(values, n_runs)
+        if self.repeat == 1:
+            return values
+        counts = np.full(n_runs, self.repeat, dtype=np.int64)
+        counts[0] -= start - first_run * self.repeat
+        counts[-1] -= (first_run + n_runs) * self.repeat - stop
+        return np.repeat(values, counts)
+
+    def __array__(self, dtype=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    def tolist(self):
+        return np.asarray(self).tolist()
+
+
+class IntervalIndex(object):
+    """
+    Read-only array-like of sorted, distinct indices stored as runs of
+    consecutive values. A position maps to its value by a binary search of
+    the runs.
+    """
+
+    def __init__(self, starts, lengths, dtype=np.int64):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        """np.array: First value of each run"""
+        self.offsets = np.append(0, np.cumsum(lengths, dtype=np.int64))
+        """np.array: Position of the first value of each run, then the
+        total length"""
+        self.length = int(self.offsets[-1])
+        self.dtype = np.dtype(dtype)
+        self.shape = (self.length,)
+        self.ndim = 1
+        # for single lookups, which are quicker with lists than arrays
+        self._start_list = self.starts.tolist()
+        self._offset_list = self.offsets.tolist()
+
+    @classmethod
+    def from_indices(cls, indices):
+        """
+        Create from an array of sorted, distinct indices
+
+        Args:
+            indices (np.array): Indices to compress
+        Returns:
+            IntervalIndex: Runs of the indices
+        """
+        indices = np.asarray(indices)
+        if len(indices) == 0:
+            return cls([], [], indices.dtype)
+        firsts = np.append(0, np.flatnonzero(np.diff(indices) != 1) + 1)
+        lengths = np.diff(np.append(firsts, len(indices)))
+        return cls(indices[firsts], lengths, indices.dtype)
+
+    @property
+    def runs(self):
+        """int: Number of runs of consecutive values"""
+        return len(self.starts)
+
+    @property
+    def nbytes(self):
+        return self.starts.nbytes + self.offsets.nbytes
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.length)
+            if step == 1:
+                return self._contiguous(start, max(start, stop))
+            idx = np.arange(start, stop, step)
+        elif isinstance(idx, (int, np.integer)) or np.ndim(idx) == 0:
+            idx = int(idx)
+            if idx < 0:
+                idx += self.length
+            if idx < 0 or idx >= self.length:
+                raise IndexError("Index %d out of range" % idx)
+            run = bisect_right(self._offset_list, idx) - 1
+            return self._start_list[run] + idx - self._offset_list[run]
+        else:
+            idx = np.asarray(idx)
+            idx = np.where(idx < 0, idx + self.length, idx)
+        run = np.searchsorted(self.offsets, idx, side="right") - 1
+        return (self.starts[run] + (idx - self.offsets[run])).astype(
+            self.dtype)
+
+    def _contiguous(self, start, stop):
+        # Expand the parts of the runs between positions start and stop
+        if start == stop:
+            return np.zeros(0, dtype=self.dtype)
+        first, last = np.searchsorted(
+            self.offsets, [start, stop - 1], side="right") - 1
+        starts = self.starts[first:last + 1].copy()
+        lengths = np.diff(self.offsets[first:last + 2])
+        starts[0] += start - self.offsets[first]
+        lengths[0] -= start - self.offsets[first]
+        lengths[-1] -= self.offsets[last + 1] - stop
+        return _ragged_ranges(starts, lengths).astype(self.dtype)
+
+    def contiguous(self, start, stop):
+        """
+        Find whether positions start to stop lie within one run
+
+        Returns:
+            int: The value at start if they do, otherwise None
+        """
+        if start >= stop:
+            return None
+        run = int(np.searchsorted(self.offsets, start, side="right")) - 1
+        if stop > self.offsets[run + 1]:
+            return None
+        return int(self.starts[run] + start - self.offsets[run])
+
+    def __array__(self, dtype=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    def tolist(self):
+        return np.asarray(self).tolist()
+
+
+class _IntervalAxis(object):
+    """
+    Read-only array-like view of one axis of the unrolled product of a
+    Dimension's generators at the indices of an IntervalIndex
+    """
+
+    def __init__(self, source, index):
+        self.source = source
+        """_ProductAxis: Values over the full product"""
+        self.index = index
+        """IntervalIndex: Indices of the values within source"""
+        self.dtype = source.dtype
+        self.shape = (len(index),)
+        self.ndim = 1
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self.index))
+            if step == 1:
+                first = self.index.contiguous(start, stop)
+                if first is not None:
+                    return self.source[first:first + stop - start]
+        return self.source[self.index[idx]]
+
+    def __array__(self, dtype=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    def tolist(self):
+        return np.asarray(self).tolist()
 
-from scanpointgenerator.compat import np
 
 class Dimension(object):
     """
@@ -29,6 +320,8 @@ class Dimension(object):
         """list(float): Lower bound for the dimension"""
         self.alternate = self.generators[0].alternate
         self._prepared = False
+        self._mask = None
+        self._mask_size = None
         self.indices = []
 
         # validate alternating constraints
@@ -45,6 +338,22 @@ class Dimension(object):
             started_alternating = started_alternating or g.alternate
 
 
+    @property
+    def mask(self):
+        """PackedMask: Mask of the points kept within the product of the
+        generators, or None if it was not produced by prepare"""
+        if self._mask is None and self._mask_size is not None:
+            # prepared from the surviving indices, so create on first access
+            self._mask = PackedMask.from_indices(
+                np.asarray(self.indices), self._mask_size)
+        return self._mask
+
+    @mask.setter
+    def mask(self, mask):
+        self._mask = mask
+        self._mask_size = None
+
+
     def apply_excluder(self, excluder):
         """Add an excluder to the current Dimension"""
         if self._prepared:
@@ -84,6 +393,14 @@ class Dimension(object):
             raise ValueError("Must call prepare first")
         # scale up points for axis
         gen = [g for g in self.generators if axis in g.axes][0]
+        if self.indices is None:
+            # lazily prepared, so the index arithmetic gives the mesh directly
+            repeat = 1
+            for g in self.generators[self.generators.index(gen) + 1:]:
+                repeat *= g.size
+            points = np.arange(gen.size)
+            return np.asarray(_ProductAxis(
+                points, points, repeat, gen.size, gen.alternate, self.size))
         points = gen.positions[axis]
         # just get index of points instead of actual point value
         points = np.arange(len(points))
@@ -102,7 +419,7 @@ class Dimension(object):
             points = np.append(p, points[:int(len(points)//2)])
         else:
             points = np.tile(points, int(tile))
-        return points[self.indices]
+        return points[np.asarray(self.indices)]
 
 
     def get_point(self, idx):
@@ -124,12 +441,86 @@ class Dimension(object):
         return lower, upper
 
 
-    def prepare(self):
+    def prepare(self, lazy=False, streaming=False, memmap=False,
+                memmap_dir=None, mask_workers=1, mask_block_size=None,
+                compress=False):
         """
         Prepare data structures required to determine size and
         filtered positions of the dimension.
         Must be called before get_positions or get_mesh_map are called.
+
+        Args:
+            lazy (bool): If the dimension is not masked by any excluders
+                (other than SquashingExcluders), keep only the generator
+                positions and compute dimension positions on access
+            streaming (bool): Evaluate excluder masks on one slice of the
+                outer generator at a time, keeping only the indices of
+                points that survive, rather than masking the full product
+            memmap (bool): Write positions and bounds to memory-mapped
+                temporary files as they are produced, so they do not need to
+                be held in memory. Excluder masks are evaluated a block of
+                the product at a time, as when streaming
+            memmap_dir (str): Directory for the memory-mapped files, or None
+                to use the default temporary directory
+            mask_workers (int): Number of processes used to create the
+                masks of excluders evaluated point by point. The processes
+                are started once and shared by all of the masks. Excluders
+                masked per generator or per line never use them
+            mask_block_size (int): Maximum number of points masked at a time
+                by each mask worker process
+            compress (bool): Keep the surviving points as an IntervalIndex
+                of runs of consecutive points of the product, computing
+                positions from the generator positions on access, rather
+                than storing the indices and positions of every point.
+                Unmasked dimensions are prepared lazily
         """
+        if mask_block_size is None:
+            mask_block_size = MASK_BLOCK_SIZE
+        # the pool of mask workers, started when the first mask is created
+        # as excluders masked per generator or per line do not use it
+        pools = []
+
+        def create_mask(excl, arrays):
+            if mask_workers > 1:
+                if not pools:
+                    pools.append(MaskPool(
+                        self.excluders, mask_workers, mask_block_size))
+                return pools[0].create_mask(excl, arrays)
+            return excl.create_mask(*arrays)
+
+        def create_packed_mask(excl, arrays):
+            if mask_workers == 1 and isinstance(
+                    excl, (ROIExcluder, SquashingExcluder)):
+                return excl.create_packed_mask(*arrays)
+            return PackedMask.from_mask(create_mask(excl, arrays))
+
+        try:
+            unmasked = all(
+                isinstance(e, SquashingExcluder) for e in self.excluders)
+            if unmasked and (lazy or compress):
+                self._prepare_lazy()
+            elif not unmasked and self._prepare_separable(
+                    create_mask, streaming, memmap, memmap_dir, compress):
+                return
+            elif streaming or compress or memmap:
+                # memory-mapped arrays are filled from the product a block at
+                # a time, so the full product is never held in memory
+                self._prepare_streaming(
+                    create_mask, memmap, memmap_dir, compress)
+                if not streaming:
+                    # the dense mask is only created if it is asked for
+                    self._mask_size = 1
+                    for g in self.generators:
+                        self._mask_size *= g.size
+            else:
+                self._prepare_dense(create_packed_mask, memmap, memmap_dir)
+        finally:
+            for pool in pools:
+                pool.close()
+
+
+    def _prepare_dense(self, create_packed_mask, memmap=False,
+                       memmap_dir=None):
         axis_positions = {}
         axis_bounds_lower = {}
         axis_bounds_upper = {}
@@ -160,14 +551,13 @@ class Dimension(object):
                 axis_positions[axis] = positions
             tilings *= gen.size
 
-        # produce excluder masks
+        # produce excluder masks, packed to a bit per point
         for excl in self.excluders:
             arrays = [axis_positions[axis] for axis in excl.axes]
-            excluder_mask = excl.create_mask(*arrays)
-            masks.append(excluder_mask)
+            masks.append(create_packed_mask(excl, arrays))
 
         # AND all masks together (empty mask is all values selected)
-        mask = masks[0] if len(masks) else np.full(dim_size, True, dtype=np.int8)
+        mask = masks[0] if len(masks) else PackedMask.ones(dim_size)
         for m in masks[1:]:
             mask &= m
 
@@ -194,12 +584,395 @@ class Dimension(object):
         self.mask = mask
         self.indices = self.mask.nonzero()[0]
         self.size = len(self.indices)
-        self.positions = {axis:axis_positions[axis][self.indices] for axis in axis_positions}
+        self.positions = {axis:_take(axis_positions[axis], self.indices, memmap, memmap_dir)
+                          for axis in axis_positions}
         self.upper_bounds = {axis:self.positions[axis] for axis in self.positions}
         self.lower_bounds = {axis:self.positions[axis] for axis in self.positions}
         for axis in axis_bounds_lower:
-            self.upper_bounds[axis] = axis_bounds_upper[axis][self.indices]
-            self.lower_bounds[axis] = axis_bounds_lower[axis][self.indices]
+            self.upper_bounds[axis] = _take(
+                axis_bounds_upper[axis], self.indices, memmap, memmap_dir)
+            self.lower_bounds[axis] = _take(
+                axis_bounds_lower[axis], self.indices, memmap, memmap_dir)
+        self._prepared = True
+
+
+    def restore(self, positions, lower_bounds, upper_bounds, indices=None):
+        """
+        Mark the dimension as prepared using previously prepared arrays
+        instead of calling prepare.
+
+        Args:
+            positions (dict): Dict of axis name -> array of positions
+            lower_bounds (dict): Dict of axis name -> array of lower bounds
+            upper_bounds (dict): Dict of axis name -> array of upper bounds
+            indices (np.array): Indices of the points within the product of
+                the generators, or None if no points are excluded
+        """
+        if self._prepared:
+            raise ValueError("Dimension already prepared")
+        self.positions = positions
+        self.lower_bounds = lower_bounds
+        self.upper_bounds = upper_bounds
+        self.mask = None
+        self.indices = indices
+        self.size = len(positions[self.axes[0]])
+        self._prepared = True
+
+
+    def _product_axes(self):
+        """
+        Create lazy positions, lower bounds and upper bounds for each axis
+        over the full (unmasked) product of the generators
+        """
+        dim_size = 1
+        for g in self.generators:
+            dim_size *= g.size
+
+        positions = {}
+        repeats = dim_size
+        for gen in self.generators:
+            repeats //= gen.size
+            for axis in gen.axes:
+                gen_positions = gen.positions[axis]
+                positions[axis] = _ProductAxis(
+                    gen_positions, gen_positions, repeats, gen.size,
+                    gen.alternate, dim_size)
+
+        upper_bounds = {axis:positions[axis] for axis in positions}
+        lower_bounds = {axis:positions[axis] for axis in positions}
+        gen = self.generators[-1]
+        if getattr(gen, "bounds", None):
+            # a reversed run swaps the upper and lower bounds of each point
+            for axis in gen.axes:
+                upper_base = gen.bounds[axis][1:]
+                lower_base = gen.bounds[axis][:-1]
+                upper_bounds[axis] = _ProductAxis(
+                    upper_base, lower_base, 1, gen.size, gen.alternate,
+                    dim_size)
+                lower_bounds[axis] = _ProductAxis(
+                    lower_base, upper_base, 1, gen.size, gen.alternate,
+                    dim_size)
+        return positions, lower_bounds, upper_bounds
+
+
+    def _prepare_lazy(self):
+        self.positions, self.lower_bounds, self.upper_bounds = \
+            self._product_axes()
+        self.mask = None
+        self.indices = None
+        self.size = len(self.positions[self.axes[0]])
+        self._prepared = True
+
+
+    def _prepare_streaming(self, create_mask, memmap=False, memmap_dir=None,
+                           compress=False):
+        positions, lower_bounds, upper_bounds = self._product_axes()
+        dim_size = len(positions[self.axes[0]])
+        # walk the product one slice of the outer generator at a time,
+        # splitting slices which are too large to hold in memory at once
+        slice_size = dim_size // self.generators[0].size
+        if slice_size > STREAMING_BLOCK_SIZE:
+            block_size = STREAMING_BLOCK_SIZE
+        else:
+            block_size = slice_size * (STREAMING_BLOCK_SIZE // slice_size)
+        index_dtype = np.uint32 if dim_size <= 2 ** 32 else np.int64
+
+        surviving = []
+        for start in range_(0, dim_size, block_size):
+            stop = min(start + block_size, dim_size)
+            block_positions = {}
+            mask = None
+            for excl in self.excluders:
+                if isinstance(excl, SquashingExcluder):
+                    continue
+                for axis in excl.axes:
+                    if axis not in block_positions:
+                        block_positions[axis] = positions[axis][start:stop]
+                arrays = [block_positions[axis] for axis in excl.axes]
+                excluder_mask = create_mask(excl, arrays)
+                if mask is None:
+                    mask = excluder_mask
+                else:
+                    mask &= excluder_mask
+            if mask is None:
+                surviving.append(np.arange(start, stop, dtype=index_dtype))
+            else:
+                surviving.append(
+                    (mask.nonzero()[0] + start).astype(index_dtype))
+
+        self.mask = None
+        if compress:
+            self._take_intervals(
+                IntervalIndex.from_indices(np.concatenate(surviving)),
+                positions, lower_bounds, upper_bounds)
+            return
+        self._take_product(
+            np.concatenate(surviving), positions, lower_bounds, upper_bounds,
+            memmap, memmap_dir)
+
+
+    def _prepare_separable(self, create_mask, streaming=False, memmap=False,
+                           memmap_dir=None, compress=False):
+        """
+        Mask each generator separately for the excluders that can be
+        separated by axis or whose axes are all of one generator, or each
+        line of a generator for those that keep one interval of it for each
+        point of an outer generator. The
+        surviving indices are then built from the kept points of each
+        generator without evaluating the full product. Any other excluders
+        are only evaluated at the surviving points.
+
+        Returns:
+            bool: Whether any excluder could be separated, if not then the
+                dimension has not been prepared
+        """
+        generator_masks = [np.full(g.size, True) for g in self.generators]
+        # (outer generator index, starts, stops) for each generator, where
+        # starts and stops give the interval of points kept for each point
+        # of the outer generator
+        generator_intervals = [[] for _ in self.generators]
+        separated = False
+        remaining = []
+        for excl in self.excluders:
+            if isinstance(excl, SquashingExcluder):
+                continue
+            gens = [[g for g in self.generators if axis in g.axes][0]
+                    for axis in excl.axes]
+            axis_masks, intervals = None, None
+            if isinstance(excl, ROIExcluder):
+                axis_masks = excl.create_axis_masks(
+                    *[g.positions[axis] for g, axis in zip(gens, excl.axes)])
+                if axis_masks is None and len(self.generators) > 1 \
+                        and all(g is gens[0] for g in gens):
+                    # every axis is of one generator, so mask only its points
+                    axis_masks = [create_mask(
+                        excl, [gens[0].positions[axis] for axis in excl.axes])]
+                    gens = gens[:1]
+                elif axis_masks is None:
+                    intervals = self._line_intervals(excl, gens)
+            if axis_masks is not None:
+                for g, axis_mask in zip(gens, axis_masks):
+                    generator_masks[self.generators.index(g)] &= \
+                        axis_mask.astype(bool)
+            elif intervals is not None:
+                outer, inner, starts, stops = intervals
+                generator_intervals[inner].append((outer, starts, stops))
+            else:
+                remaining.append(excl)
+                continue
+            separated = True
+        if not separated:
+            return False
+
+        # Extend the flat indices of the kept points of the outer generators
+        # by the kept points of each generator in turn, which are a slice of
+        # those kept by its mask for each outer index. A generator's points
+        # are reversed on odd runs when alternating. Unless writing them to
+        # files, positions are gathered at the same time
+        indices = np.zeros(1, dtype=np.int64)
+        values = None if memmap or compress else {}
+        odd = None
+        intervals = None
+        for n, gen in enumerate(self.generators):
+            kept = np.flatnonzero(generator_masks[n])
+            # number of points kept by the mask before each point
+            ranks = np.append(0, np.cumsum(generator_masks[n]))
+            lower = np.zeros(len(indices), dtype=np.int64)
+            upper = np.full(len(indices), len(kept), dtype=np.int64)
+            for outer, starts, stops in generator_intervals[n]:
+                point = self._point_indices(indices, outer, n)
+                lower = np.maximum(lower, ranks[starts[point]])
+                upper = np.minimum(upper, ranks[stops[point]])
+            counts = np.maximum(upper - lower, 0)
+            odd_rows = indices % 2 == 1 if gen.alternate else None
+            if len(kept) == gen.size:
+                # every point is kept, so the slots of each row are consecutive
+                first_slots = lower if odd_rows is None else np.where(
+                    odd_rows, gen.size - upper, lower)
+                if compress and not remaining \
+                        and gen is self.generators[-1]:
+                    # which are the runs of the interval index
+                    nonempty = counts > 0
+                    intervals = IntervalIndex(
+                        (indices * gen.size + first_slots)[nonempty],
+                        counts[nonempty])
+                    break
+            if gen.alternate:
+                odd = np.repeat(odd_rows, counts)
+                rank = _ragged_ranges(np.where(odd_rows, upper - 1, lower),
+                                      counts, np.where(odd_rows, -1, 1))
+            else:
+                odd = None
+                rank = _ragged_ranges(lower, counts)
+            if len(kept) == gen.size:
+                points = rank
+                indices = _ragged_ranges(
+                    indices * gen.size + first_slots, counts)
+            else:
+                points = kept[rank]
+                slots = points if odd is None else np.where(
+                    odd, gen.size - 1 - points, points)
+                indices = np.repeat(indices * gen.size, counts) + slots
+            if values is not None:
+                values = {axis:np.repeat(values[axis], counts)
+                          for axis in values}
+                for axis in gen.axes:
+                    values[axis] = gen.positions[axis][points]
+
+        positions, lower_bounds, upper_bounds = self._product_axes()
+        dim_size = len(positions[self.axes[0]])
+        for excl in remaining:
+            keep = np.zeros(len(indices), dtype=bool)
+            for start in range_(0, len(indices), STREAMING_BLOCK_SIZE):
+                stop = start + STREAMING_BLOCK_SIZE
+                if values is None:
+                    arrays = [positions[axis][indices[start:stop]]
+                              for axis in excl.axes]
+                else:
+                    arrays = [values[axis][start:stop] for axis in excl.axes]
+                keep[start:stop] = create_mask(excl, arrays)
+            indices = indices[keep]
+            if values is not None:
+                values = {axis:values[axis][keep] for axis in values}
+                points = points[keep]
+                if odd is not None:
+                    odd = odd[keep]
+
+        index_dtype = np.uint32 if dim_size <= 2 ** 32 else np.int64
+        if compress:
+            if intervals is None:
+                intervals = IntervalIndex.from_indices(indices)
+            intervals.dtype = np.dtype(index_dtype)
+            self._take_intervals(
+                intervals, positions, lower_bounds, upper_bounds)
+        elif values is None:
+            self._take_product(
+                indices.astype(index_dtype), positions, lower_bounds,
+                upper_bounds, memmap, memmap_dir)
+        else:
+            self._take_points(
+                indices.astype(index_dtype), values, points, odd)
+        if not streaming:
+            # the dense mask is only created if it is asked for
+            self._mask_size = dim_size
+        return True
+
+
+    def _take_intervals(self, intervals, positions, lower_bounds,
+                        upper_bounds):
+        # Prepare from the runs of surviving points, viewing the product
+        self.indices = intervals
+        self.size = len(self.indices)
+        self.positions = {
+            axis:_IntervalAxis(positions[axis], intervals)
+            for axis in positions}
+        self.upper_bounds = {
+            axis:self.positions[axis] for axis in self.positions}
+        self.lower_bounds = {
+            axis:self.positions[axis] for axis in self.positions}
+        for axis in self.generators[-1].axes:
+            if upper_bounds[axis] is not positions[axis]:
+                self.upper_bounds[axis] = _IntervalAxis(
+                    upper_bounds[axis], intervals)
+                self.lower_bounds[axis] = _IntervalAxis(
+                    lower_bounds[axis], intervals)
+        self._prepared = True
+
+
+    def _take_points(self, indices, positions, points, odd):
+        """
+        Prepare from the indices of the surviving points within the product
+        and their positions, given the point of the innermost generator at
+        each, and whether it is on a reversed run
+        """
+        self.indices = indices
+        self.size = len(self.indices)
+        self.positions = positions
+        self.upper_bounds = {
+            axis:self.positions[axis] for axis in self.positions}
+        self.lower_bounds = {
+            axis:self.positions[axis] for axis in self.positions}
+        gen = self.generators[-1]
+        if getattr(gen, "bounds", None):
+            # a reversed run swaps the upper and lower bounds of each point
+            for axis in gen.axes:
+                upper = gen.bounds[axis][1:][points]
+                lower = gen.bounds[axis][:-1][points]
+                if odd is not None:
+                    upper, lower = np.where(odd, lower, upper), \
+                        np.where(odd, upper, lower)
+                self.upper_bounds[axis] = upper
+                self.lower_bounds[axis] = lower
+        self._prepared = True
+
+
+    def _line_intervals(self, excluder, gens):
+        """
+        Find the interval of points of the inner of the two generators of
+        an excluder that it keeps for each point of the outer generator
+
+        Returns:
+            tuple: (outer generator index, inner generator index, starts,
+                stops), or None if the excluder does not give intervals or
+                the inner axis positions are not sorted
+        """
+        if len(excluder.axes) != 2 or gens[0] is gens[1]:
+            return None
+        gen_indices = [self.generators.index(g) for g in gens]
+        inner = 1 if gen_indices[1] > gen_indices[0] else 0
+        gen = gens[inner]
+        line = gen.positions[excluder.axes[inner]]
+        descending = len(line) > 1 and line[0] > line[-1]
+        if descending:
+            line = line[::-1]
+        if np.any(line[1:] < line[:-1]):
+            return None
+        arrays = [None, None]
+        arrays[inner] = line
+        arrays[1 - inner] = gens[1 - inner].positions[excluder.axes[1 - inner]]
+        intervals = excluder.create_intervals(inner, *arrays)
+        if intervals is None:
+            return None
+        starts, stops = intervals
+        if descending:
+            starts, stops = gen.size - stops, gen.size - starts
+        return gen_indices[1 - inner], gen_indices[inner], starts, stops
+
+
+    def _point_indices(self, indices, n, count):
+        """
+        Find the point of generator n at each flat index of the product of
+        the first count generators
+        """
+        repeat = 1
+        for g in self.generators[n + 1:count]:
+            repeat *= g.size
+        size = self.generators[n].size
+        run = indices // repeat
+        points = run % size
+        if self.generators[n].alternate:
+            points = np.where(run // size % 2 == 1, size - 1 - points, points)
+        return points
+
+
+    def _take_product(self, indices, positions, lower_bounds, upper_bounds,
+                      memmap=False, memmap_dir=None):
+        # Prepare from the indices of the surviving points within the product
+        self.indices = indices
+        self.size = len(self.indices)
+        self.positions = {
+            axis:_take(positions[axis], self.indices, memmap, memmap_dir)
+            for axis in positions}
+        self.upper_bounds = {
+            axis:self.positions[axis] for axis in self.positions}
+        self.lower_bounds = {
+            axis:self.positions[axis] for axis in self.positions}
+        for axis in self.generators[-1].axes:
+            if upper_bounds[axis] is not positions[axis]:
+                self.upper_bounds[axis] = _take(
+                    upper_bounds[axis], self.indices, memmap, memmap_dir)
+                self.lower_bounds[axis] = _take(
+                    lower_bounds[axis], self.indices, memmap, memmap_dir)
         self._prepared = True
 
 
@@ -10,6 +10,7 @@
 from annotypes import Serializable, Anno, Array, Union, Sequence
 
 from scanpointgenerator.compat import np
+from scanpointgenerator.core.packedmask import PackedMask
 
 with Anno("Names of axes to exclude points from"):
     AExcluderAxes = Array[str]
@@ -27,3 +28,14 @@ class Excluder(Serializable):
     def create_mask(self, *point_arrays):
         # type: (np.array) -> np.array
         raise NotImplementedError("Method must be implemented in child class.")
+
+    def create_packed_mask(self, *point_arrays):
+        """Create a mask of the points to exclude with one bit per point.
+
+        Args:
+            *point_arrays (numpy.array(float)): Array of points for each axis
+
+        Returns:
+            PackedMask: Points to exclude, as create_mask
+        """
+        return PackedMask.from_mask(self.create_mask(*point_arrays))
@@ -32,3 +32,28 @@ class Mutator(Serializable):
             Point: Mutated point
         """
         raise NotImplementedError
+
+    def mutated_axes(self):
+        """
+        Declare the arrays of a Points that mutate_in_place changes, so that
+        only those need to be writable copies
+
+        Returns:
+            dict: Field ("positions", "lower" or "upper") -> list of axes
+            changed in place, or None if the mutator does not support
+            mutate_in_place
+        """
+        return None
+
+    def mutate_in_place(self, points, indices):
+        # type: (Points, Array[int]) -> None
+        """
+        Mutate the arrays of points given by mutated_axes in place, without
+        replacing them or changing any other arrays
+
+        Args:
+            points: Points object to mutate, with writable arrays for the
+                fields and axes given by mutated_axes
+            indices: indices of the points to mutate
+        """
+        raise NotImplementedError
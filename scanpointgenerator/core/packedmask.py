@@ -0,0 +1,173 @@
+###
+# Copyright (c) 2020 Diamond Light Source Ltd.
+#
+###
+
+from scanpointgenerator.compat import range_, np
+
+# Number of bytes of a PackedMask processed at a time when unpacking
+PACKED_BLOCK_SIZE = 2 ** 17
+
+# Number of bits set in each byte value
+_BIT_COUNTS = np.array(
+    [bin(byte).count("1") for byte in range_(256)], dtype=np.uint8)
+
+
+class PackedMask(object):
+    """
+    Mask of points stored as one bit per point, most significant bit first
+    as np.packbits. Bits past the length of the mask are always clear.
+    """
+
+    def __init__(self, bits, length):
+        self.bits = bits
+        """np.array(uint8): Packed bits of the mask"""
+        self.length = length
+        """int: Number of points in the mask"""
+
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Pack a mask of one value per point
+
+        Args:
+            mask (np.array): Mask where non-zero values are set
+        Returns:
+            PackedMask: The packed mask
+        """
+        mask = np.asarray(mask)
+        return cls(np.packbits(mask != 0), len(mask))
+
+    @classmethod
+    def from_indices(cls, indices, length):
+        """
+        Create a mask with only the given points set
+
+        Args:
+            indices (np.array): Sorted indices of the points to set
+            length (int): Number of points in the mask
+        Returns:
+            PackedMask: The packed mask
+        """
+        indices = np.asarray(indices)
+        bits = np.zeros((length + 7) // 8, dtype=np.uint8)
+        # pack the points of a block of bytes at a time
+        block = PACKED_BLOCK_SIZE * 8
+        ends = np.searchsorted(indices, np.arange(0, length + block, block))
+        for n, start in enumerate(range_(0, length, block)):
+            block_mask = np.zeros(min(block, length - start), dtype=bool)
+            block_mask[indices[ends[n]:ends[n + 1]] - start] = True
+            bits[start // 8:(start + block) // 8] = np.packbits(block_mask)
+        return cls(bits, length)
+
+    @classmethod
+    def ones(cls, length):
+        """
+        Create a mask with every point set
+
+        Args:
+            length (int): Number of points in the mask
+        Returns:
+            PackedMask: The packed mask
+        """
+        bits = np.full((length + 7) // 8, 0xFF, dtype=np.uint8)
+        if length % 8:
+            bits[-1] = (0xFF << (8 - length % 8)) & 0xFF
+        return cls(bits, length)
+
+    @classmethod
+    def concatenate(cls, masks):
+        """
+        Join masks end to end. Every mask but the last must have a length
+        that is a multiple of 8
+
+        Args:
+            masks (list(PackedMask)): Masks to join
+        Returns:
+            PackedMask: The joined mask
+        """
+        for mask in masks[:-1]:
+            if mask.length % 8:
+                raise ValueError("Only the last mask may end part way "
+                                 "through a byte")
+        return cls(np.concatenate([m.bits for m in masks]),
+                   sum(m.length for m in masks))
+
+    def _check(self, other):
+        if not isinstance(other, PackedMask):
+            other = PackedMask.from_mask(other)
+        if other.length != self.length:
+            raise ValueError("Mask lengths must be equal")
+        return other
+
+    def __and__(self, other):
+        return PackedMask(self.bits & self._check(other).bits, self.length)
+
+    def __or__(self, other):
+        return PackedMask(self.bits | self._check(other).bits, self.length)
+
+    def __iand__(self, other):
+        self.bits &= self._check(other).bits
+        return self
+
+    def __ior__(self, other):
+        self.bits |= self._check(other).bits
+        return self
+
+    def __len__(self):
+        return self.length
+
+    def count(self):
+        """
+        Count the points that are set
+
+        Returns:
+            int: Number of set points
+        """
+        count = 0
+        for start in range_(0, len(self.bits), PACKED_BLOCK_SIZE):
+            block = self.bits[start:start + PACKED_BLOCK_SIZE]
+            count += int(_BIT_COUNTS[block].sum(dtype=np.int64))
+        return count
+
+    def nonzero(self):
+        """
+        Find the points that are set, as np.nonzero
+
+        Returns:
+            tuple(np.array): Array of the indices of the set points
+        """
+        indices = [np.zeros(0, dtype=np.int64)]
+        for start in range_(0, len(self.bits), PACKED_BLOCK_SIZE):
+            block = self.bits[start:start + PACKED_BLOCK_SIZE]
+            # skip the unpacking of empty blocks
+            if block.any():
+                indices.append(
+                    np.flatnonzero(np.unpackbits(block)) + start * 8)
+        return (np.concatenate(indices),)
+
+    def unpack(self):
+        """
+        Unpack to one value per point
+
+        Returns:
+            np.array(int8): 1 where a point is set, otherwise 0
+        """
+        return np.unpackbits(self.bits)[:self.length].astype(np.int8)
+
+    def __array__(self, dtype=None):
+        mask = self.unpack()
+        return mask if dtype is None else mask.astype(dtype)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice) or np.ndim(idx) != 0:
+            return self.unpack()[idx]
+        idx = int(idx)
+        if idx < 0:
+            idx += self.length
+        if idx < 0 or idx >= self.length:
+            raise IndexError("Index %d out of range" % idx)
+        return (int(self.bits[idx // 8]) >> (7 - idx % 8)) & 1
+
+    def tolist(self):
+        return self.unpack().tolist()
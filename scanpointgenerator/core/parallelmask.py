@@ -0,0 +1,140 @@
+###
+# Copyright (c) 2020 Diamond Light Source Ltd.
+#
+###
+
+import ctypes
+
+from scanpointgenerator.compat import range_, np
+
+# Default number of points each worker process masks at a time
+MASK_BLOCK_SIZE = 2 ** 20
+
+# Excluders and shared arrays of a worker process, set by _init_worker
+_worker = {}
+
+
+def _shared_buffer(nbytes):
+    """Allocate shared memory that child processes can inherit"""
+    # imported here as multiprocessing is not available on all platforms
+    from multiprocessing.sharedctypes import RawArray
+    return RawArray(ctypes.c_char, max(nbytes, 1))
+
+
+def _init_worker(excluders, inputs, output):
+    _worker["excluders"] = excluders
+    _worker["inputs"] = inputs
+    _worker["output"] = np.frombuffer(output, dtype=np.int8)
+
+
+def _mask_block(task):
+    index, dtypes, start, stop = task
+    arrays = [np.frombuffer(buf, dtype=dtype)[start:stop]
+              for buf, dtype in zip(_worker["inputs"], dtypes)]
+    _worker["output"][start:stop] = \
+        _worker["excluders"][index].create_mask(*arrays)
+
+
+class MaskPool(object):
+    """
+    Pool of worker processes creating the masks of a set of excluders. Points
+    are copied into shared memory a batch of blocks at a time and each block
+    is masked by a worker, so the pool is started once however many masks it
+    creates and points are never pickled.
+    """
+
+    def __init__(self, excluders, workers, block_size=MASK_BLOCK_SIZE):
+        """
+        Args:
+            excluders (list(Excluder)): Excluders the pool creates masks of
+            workers (int): Number of worker processes
+            block_size (int): Maximum number of points masked by each task
+        """
+        from multiprocessing import Pool
+        self.excluders = list(excluders)
+        self.workers = workers
+        self.block_size = block_size
+        # a block for every worker is held in shared memory at once, with
+        # room for 8 bytes per point of each excluder axis
+        self.capacity = workers * block_size
+        n_axes = max([len(e.axes) for e in self.excluders] + [1])
+        self._inputs = [_shared_buffer(self.capacity * 8)
+                        for _ in range_(n_axes)]
+        self._output = _shared_buffer(self.capacity)
+        self._pool = Pool(workers, initializer=_init_worker,
+                          initargs=(self.excluders, self._inputs, self._output))
+
+    def create_mask(self, excluder, point_arrays):
+        """
+        Create the mask of one of the pool's excluders, splitting the points
+        into at least one block per worker
+
+        Args:
+            excluder (Excluder): Excluder to create the mask of
+            point_arrays (list(np.array)): Array of points for each axis
+        Returns:
+            np.array(int8): Array of points to exclude, as
+                excluder.create_mask
+        """
+        length = len(point_arrays[0])
+        for arr in point_arrays:
+            if len(arr) != length:
+                raise ValueError("Points lengths must be equal")
+        arrays = [np.asarray(arr) for arr in point_arrays]
+        index = [i for i, e in enumerate(self.excluders) if e is excluder]
+        if length == 0 or not index or any(
+                arr.dtype.hasobject or arr.dtype.itemsize > 8
+                for arr in arrays):
+            return excluder.create_mask(*point_arrays)
+
+        dtypes = [arr.dtype.str for arr in arrays]
+        block_size = min(self.block_size, -(-length // self.workers))
+        output = np.frombuffer(self._output, dtype=np.int8)
+        mask = np.empty(length, dtype=np.int8)
+        for batch in range_(0, length, self.capacity):
+            n = min(self.capacity, length - batch)
+            for buf, arr in zip(self._inputs, arrays):
+                np.frombuffer(buf, dtype=arr.dtype)[:n] = arr[batch:batch + n]
+            self._pool.map(_mask_block, [
+                (index[0], dtypes, start, min(start + block_size, n))
+                for start in range_(0, n, block_size)])
+            mask[batch:batch + n] = output[:n]
+        return mask
+
+    def close(self):
+        """Stop the worker processes"""
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def create_mask_parallel(excluder, point_arrays, workers,
+                         block_size=MASK_BLOCK_SIZE):
+    """
+    Create the mask of an excluder by splitting the point arrays into blocks
+    which are masked in a pool of worker processes started for this mask
+    alone, see MaskPool. Arrays of no more than one block are masked in this
+    process.
+
+    Args:
+        excluder (Excluder): Excluder to create the mask of
+        point_arrays (list(np.array)): Array of points for each excluder axis
+        workers (int): Number of worker processes
+        block_size (int): Number of points masked by each task
+    Returns:
+        np.array(int8): Array of points to exclude, as excluder.create_mask
+    """
+    length = len(point_arrays[0])
+    for arr in point_arrays:
+        if len(arr) != length:
+            raise ValueError("Points lengths must be equal")
+    if workers <= 1 or length <= block_size:
+        return excluder.create_mask(*point_arrays)
+
+    with MaskPool([excluder], workers, block_size) as pool:
+        return pool.create_mask(excluder, point_arrays)
@@ -26,6 +26,9 @@ class Point(object):
         duration (int): Int or None for duration of the point exposure
         delay_after (float): Float or None. Insert a time delay after every point
     """
+    __slots__ = ("positions", "lower", "upper", "indexes", "duration",
+                 "delay_after")
+
     def __init__(self):
         self.positions = {}
         self.lower = {}
@@ -37,6 +40,23 @@ class Point(object):
     def __len__(self):
         return 1
 
+    def clear(self):
+        """Empty the point in place so it can be reused for another point
+
+        Returns:
+            Point: self
+        """
+        self.positions.clear()
+        self.lower.clear()
+        self.upper.clear()
+        if isinstance(self.indexes, list):
+            del self.indexes[:]
+        else:
+            self.indexes = []
+        self.duration = None
+        self.delay_after = None
+        return self
+
 
 class Points(object):
     """Contains information about multiple points
@@ -53,6 +73,9 @@ class Points(object):
         duration (int array): Int array or None for duration of the points exposures
         delay_after (float array): Float array or None. Insert a time delay after every point
     """
+    __slots__ = ("positions", "lower", "upper", "indexes", "duration",
+                 "delay_after", "_builder")
+
     def __init__(self):
         self.positions = {}
         self.lower = {}
@@ -60,6 +83,8 @@ class Points(object):
         self.indexes = []
         self.duration = None
         self.delay_after = None
+        # PointsBuilder whose arrays this views, after points were added
+        self._builder = None
 
     def __len__(self):
         return len(self.indexes)
@@ -69,6 +94,8 @@ class Points(object):
         other (Point or Points)
         Appends the positions, bounds, indices, duration, delay of another Points or Point to self
         Assumes that dimensions are shared, or that either self or other have no positions.
+        The arrays are kept in a PointsBuilder with room to grow, so repeatedly adding to the
+        same Points copies each point a constant number of times on average.
         returns: self
         """
         if not len(self):
@@ -76,16 +103,19 @@ class Points(object):
                 return other.__copy__()
             return self.wrap(other)
         if len(other):
-            self.positions.update({axis: np.append(self.positions[axis], other.positions[axis])
-                                   for axis in other.positions})
-            self.lower.update({axis: np.append(self.lower[axis], other.lower[axis]) for axis in other.lower})
-            self.upper.update({axis: np.append(self.upper[axis], other.upper[axis]) for axis in other.upper})
-            if isinstance(other, Point):
-                self.indexes = np.vstack((self.indexes, other.indexes))
-            elif len(other):
-                self.indexes = np.concatenate((self.indexes, other.indexes), axis=0)
-            self.duration = np.append(self.duration, other.duration)
-            self.delay_after = np.append(self.delay_after, other.delay_after)
+            builder = self._builder
+            if builder is None or not builder.is_viewed_by(self):
+                builder = PointsBuilder(capacity=2 * (len(self) + len(other)))
+                builder.append(self)
+            builder.append(other)
+            points = builder.view()
+            self.positions.update(points.positions)
+            self.lower.update(points.lower)
+            self.upper.update(points.upper)
+            self.indexes = points.indexes
+            self.duration = points.duration
+            self.delay_after = points.delay_after
+            self._builder = builder
         return self
 
     def __getitem__(self, sliced):
@@ -107,10 +137,17 @@ class Points(object):
         point.delay_after = self.delay_after[sliced]
         return point
 
-    def extract(self, points):
-        self.positions.update({axis: points.positions[axis].copy() for axis in points.positions})
-        self.lower.update({axis: points.lower[axis].copy() for axis in points.lower})
-        self.upper.update({axis: points.upper[axis].copy() for axis in points.upper})
+    def extract(self, points, indexes=True, copy=True):
+        if not copy:
+            self.positions.update(points.positions)
+            self.lower.update(points.lower)
+            self.upper.update(points.upper)
+        else:
+            self.positions.update({axis: points.positions[axis].copy() for axis in points.positions})
+            self.lower.update({axis: points.lower[axis].copy() for axis in points.lower})
+            self.upper.update({axis: points.upper[axis].copy() for axis in points.upper})
+        if not indexes:
+            return
         if len(self.indexes):  # if indices is not empty: assumption that length of indices is consistent
             self.indexes = np.column_stack((self.indexes, points.indexes))
         else:
@@ -118,14 +155,60 @@ class Points(object):
 
     def __copy__(self):
         points = Points()
-        points.positions.update({self.positions[axis].copy() for axis in self.positions})
-        points.lower.update({self.lower[axis].copy() for axis in self.lower})
-        points.upper.update({self.upper[axis].copy() for axis in self.upper})
+        points.positions.update({axis: self.positions[axis].copy() for axis in self.positions})
+        points.lower.update({axis: self.lower[axis].copy() for axis in self.lower})
+        points.upper.update({axis: self.upper[axis].copy() for axis in self.upper})
         points.delay_after = self.delay_after.copy()
         points.duration = self.duration.copy()
         points.indexes = self.indexes.copy()
         return points
 
+    def to_structured(self, axes=None):
+        """
+        Copy the points into a single contiguous numpy structured array with
+        one record per point. Each record has the fields:
+
+        - positions: float64 sub-record with a field per axis
+        - lower: float64 sub-record with a field per axis
+        - upper: float64 sub-record with a field per axis
+        - indexes: int64 array of the index in each dataset dimension,
+          fastest changing last
+        - duration: float64 (NaN if not set)
+        - delay_after: float64 (NaN if not set)
+
+        E.g. array["positions"]["x"] gives every x position.
+
+        Args:
+            axes (list(str)): Order of the axis fields. Defaults to the order
+                of the positions dict
+        Returns:
+            np.array: Structured array of length len(self)
+        """
+        if axes is None:
+            axes = list(self.positions)
+        length = len(self)
+        indexes = np.asarray(self.indexes)
+        if indexes.ndim < 2:
+            indexes = indexes.reshape(length, -1 if length else 1)
+        axis_dtype = [(str(axis), np.float64) for axis in axes]
+        dtype = np.dtype([
+            ("positions", axis_dtype),
+            ("lower", axis_dtype),
+            ("upper", axis_dtype),
+            ("indexes", np.int64, (indexes.shape[1],)),
+            ("duration", np.float64),
+            ("delay_after", np.float64)])
+        array = np.empty(length, dtype=dtype)
+        for axis in axes:
+            array["positions"][str(axis)] = self.positions[axis]
+            array["lower"][str(axis)] = self.lower[axis]
+            array["upper"][str(axis)] = self.upper[axis]
+        array["indexes"] = indexes
+        for field in ("duration", "delay_after"):
+            value = getattr(self, field)
+            array[field] = np.nan if value is None else value
+        return array
+
     @staticmethod
     def wrap(point):
         """
@@ -142,12 +225,199 @@ class Points(object):
         return points
 
     @staticmethod
-    def points_from_axis_point(dim, index, length):
+    def is_broadcast(column):
+        """
+        Whether a column is a single value broadcast to every point, which
+        can be read from column[0] without expanding it
+
+        Args:
+            column (np.array): positions, lower or upper array of an axis
+        Returns:
+            bool: True if every element of column shares the same memory
+        """
+        return isinstance(column, np.ndarray) and column.ndim == 1 and \
+            len(column) > 1 and column.strides[0] == 0
+
+    @staticmethod
+    def points_from_axis_point(dim, index, length, broadcast=False,
+                               reverse=False):
+        """
+        Args:
+            dim (Dimension): Dimension that does not step within the points
+            index (int): Index of the dimension point
+            length (int): Number of points
+            broadcast (bool): If True, make each column a read-only array
+                broadcasting the single value rather than repeating it
+            reverse (bool): If True, the point is on a reversed run of an
+                alternating dimension, so its lower and upper bounds swap
+        Returns:
+            Points: Points with every point at the dimension index
+        """
+        if broadcast:
+            def column(value):
+                return np.broadcast_to(value, (length,))
+        else:
+            def column(value):
+                return np.full(length, value)
+
         points = Points()
-        dimension_points = {axis: np.full(length, dim.positions[axis][index]) for axis in dim.positions}
-        lower, upper = dim.get_bounds(index)
+        dimension_points = {axis: column(dim.positions[axis][index]) for axis in dim.positions}
+        lower, upper = dim.get_bounds(index, reverse)
         points.positions.update(dimension_points)
-        points.lower.update({axis: np.full(length, lower[axis]) for axis in lower})
-        points.upper.update({axis: np.full(length, upper[axis]) for axis in upper})
-        points.indexes = np.full(length, index)
+        points.lower.update({axis: column(lower[axis]) for axis in lower})
+        points.upper.update({axis: column(upper[axis]) for axis in upper})
+        points.indexes = column(index)
+        return points
+
+
+class PointsBuilder(object):
+    """Accumulates Point and Points objects into preallocated arrays
+
+    The arrays double in size whenever they are full, so appending n points
+    copies O(n) values in total, where adding to a Points copies every
+    existing value on each addition. All appended points must share the
+    axes and number of dimensions of the first.
+
+    Args:
+        capacity (int): Number of points to allocate space for initially
+    """
+    __slots__ = ("_capacity", "_length", "_points", "_view")
+
+    def __init__(self, capacity=1024):
+        self._capacity = max(int(capacity), 1)
+        self._length = 0
+        self._points = None
+        self._view = None
+
+    def __len__(self):
+        return self._length
+
+    def append(self, point):
+        """Copy a Point or Points onto the end of the accumulated points
+
+        Args:
+            point (Point or Points): Point(s) to append
+        Returns:
+            PointsBuilder: self
+        Raises:
+            ValueError: If the axes differ from those of the first point
+        """
+        if isinstance(point, Point):
+            n = 1
+            index = self._length
+        else:
+            n = len(point)
+            index = slice(self._length, self._length + n)
+        if not n:
+            return self
+        if self._points is None:
+            self._capacity = max(self._capacity, n)
+            self._points = self._allocate(point, isinstance(point, Point))
+        else:
+            for field in ("positions", "lower", "upper"):
+                if set(getattr(point, field)) != set(getattr(self._points, field)):
+                    raise ValueError(
+                        "Axes of %s %s do not match those of the first point %s" % (
+                            field, sorted(getattr(point, field)),
+                            sorted(getattr(self._points, field))))
+        if self._length + n > self._capacity:
+            capacity = self._capacity
+            while self._length + n > capacity:
+                capacity *= 2
+            self._grow(capacity)
+        points = self._points
+        for field in ("positions", "lower", "upper"):
+            arrays = getattr(points, field)
+            for axis, value in getattr(point, field).items():
+                arrays[axis][index] = value
+        # a Point's indexes are a list even for a single dimension
+        points.indexes[index] = np.reshape(
+            point.indexes, points.indexes[index].shape)
+        points.duration[index] = point.duration
+        points.delay_after[index] = point.delay_after
+        self._length += n
+        return self
+
+    def build(self):
+        """Finish building, leaving the builder empty
+
+        Returns:
+            Points: The accumulated points, as views of the builder's arrays
+        """
+        points = self.view()
+        self._points = None
+        self._length = 0
+        self._view = None
         return points
+
+    def view(self):
+        """View the points accumulated so far, which later appends leave
+        unchanged unless the views are written to
+
+        Returns:
+            Points: The accumulated points, as views of the builder's arrays
+        """
+        points = Points()
+        if self._points is not None:
+            length = self._length
+            built = self._points
+            for field in ("positions", "lower", "upper"):
+                getattr(points, field).update(
+                    {axis: value[:length] for axis, value in getattr(built, field).items()})
+            points.indexes = built.indexes[:length]
+            points.duration = built.duration[:length]
+            points.delay_after = built.delay_after[:length]
+        self._view = points
+        return points
+
+    def is_viewed_by(self, points):
+        """Whether every array of points is one returned by the latest view
+
+        Args:
+            points (Points): Points to check
+        Returns:
+            bool: True if points holds the latest view of every array
+        """
+        view = self._view
+        if view is None:
+            return False
+        for field in ("positions", "lower", "upper"):
+            arrays, viewed = getattr(points, field), getattr(view, field)
+            if len(arrays) != len(viewed) or any(
+                    arrays.get(axis) is not viewed[axis] for axis in viewed):
+                return False
+        return points.indexes is view.indexes and \
+            points.duration is view.duration and \
+            points.delay_after is view.delay_after
+
+    def _allocate(self, point, single):
+        def empty(value, dtype):
+            value = np.asarray(value)
+            shape = value.shape if single else value.shape[1:]
+            return np.empty((self._capacity,) + shape,
+                            dtype=np.promote_types(value.dtype, dtype))
+
+        points = Points()
+        for field in ("positions", "lower", "upper"):
+            getattr(points, field).update(
+                {axis: empty(value, np.float64) for axis, value in getattr(point, field).items()})
+        points.indexes = empty(point.indexes, np.int64)
+        points.duration = empty(point.duration, np.float64)
+        points.delay_after = empty(point.delay_after, np.float64)
+        return points
+
+    def _grow(self, capacity):
+        def grow(value):
+            grown = np.empty((capacity,) + value.shape[1:], dtype=value.dtype)
+            grown[:self._length] = value[:self._length]
+            return grown
+
+        points = self._points
+        for field in ("positions", "lower", "upper"):
+            arrays = getattr(points, field)
+            for axis in arrays:
+                arrays[axis] = grow(arrays[axis])
+        points.indexes = grow(points.indexes)
+        points.duration = grow(points.duration)
+        points.delay_after = grow(points.delay_after)
+        self._capacity = capacity
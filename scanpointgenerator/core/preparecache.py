@@ -0,0 +1,108 @@
+###
+# Copyright (c) 2020 Diamond Light Source Ltd.
+#
+###
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def _to_builtin(obj):
+    # numpy scalars and arrays passed to generators are not JSON serializable
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError("%r is not JSON serializable" % (obj,))
+
+
+def prepare_key(generators, excluders, **parameters):
+    """
+    Create a canonical hash of a scan definition and the parameters it is
+    prepared with.
+
+    Args:
+        generators (list(Generator)): Generators of the scan
+        excluders (list(Excluder)): Excluders of the scan
+        **parameters: Any other values that affect the prepared state
+    Returns:
+        str: Hex digest identifying the prepared state
+    """
+    definition = dict(
+        generators=[g.to_dict() for g in generators],
+        excluders=[e.to_dict() for e in excluders],
+        parameters=parameters)
+    serialized = json.dumps(definition, sort_keys=True, default=_to_builtin)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+class PrepareCache(object):
+    """
+    Least recently used cache of prepared CompoundGenerator state, shared by
+    every CompoundGenerator in the process when set as
+    CompoundGenerator.prepare_cache.
+
+    Cached Dimensions are shared between generators and must not be modified.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        """int: Maximum number of prepared scans to hold"""
+        self.hits = 0
+        """int: Number of lookups which found a prepared scan"""
+        self.misses = 0
+        """int: Number of lookups which did not find a prepared scan"""
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Retrieve prepared state, marking it as most recently used
+
+        Args:
+            key (str): Key created by prepare_key
+        Returns:
+            The cached state, or None if it is not cached
+        """
+        with self._lock:
+            try:
+                state = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries[key] = state
+            self.hits += 1
+            return state
+
+    def put(self, key, state):
+        """
+        Add prepared state, evicting the least recently used entries if the
+        cache is full
+
+        Args:
+            key (str): Key created by prepare_key
+            state: Prepared state to cache
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = state
+            while len(self._entries) > max(self.maxsize, 0):
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Returns:
+            CacheInfo: Hits, misses, maximum size and current size
+        """
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.maxsize, len(self._entries))
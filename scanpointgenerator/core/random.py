@@ -6,6 +6,9 @@
 #
 ###
 
+from scanpointgenerator.compat import range_, np
+
+
 class Random(object):
 
     # See: https://en.wikipedia.org/wiki/Mersenne_Twister - MT19937
@@ -29,6 +32,8 @@ class Random(object):
     l_shift = 18
     d_mask = 0xFFFFFFFF
 
+    _reversed_digits_table = None  # Created by the first random_array
+
     def __init__(self, seed):
 
         self.index = 0
@@ -81,6 +86,111 @@ class Random(object):
         
         return decimal
 
+    def random_array(self, count):
+        """
+        Generate the next count numbers of the stream that random() would
+        give, using numpy arrays for the twist and tempering of the state
+
+        Args:
+            count (int): Number of random numbers to generate
+        Returns:
+            np.array(float64): Random numbers in the range -1.0 to 1.0
+        """
+        if count <= 0:
+            return np.zeros(0)
+        # Successive states are consecutive blocks of n words of one sequence
+        words = (np.array(self.seeds, dtype=np.int64) & 0xFFFFFFFF).astype(
+            np.uint32)
+        while True:
+            tempered = self._temper_array(words[self.index:])
+            valid = np.flatnonzero(tempered >= 1000000000)  # 10 digits
+            if len(valid) >= count:
+                break
+            # About 77% of 32 bit numbers have 10 digits
+            blocks = int((count - len(valid)) / (0.75 * self.n)) + 1
+            words = self._twist_array(words, blocks)
+        valid = valid[:count]
+        # Leave the state as count calls to generate_number would
+        used = self.index + int(valid[-1]) + 1
+        block = (used - 1) // self.n
+        self.seeds = [int(seed) for seed in
+                      words[block * self.n:(block + 1) * self.n]]
+        self.index = used - block * self.n
+
+        # Reverse the 10 digits, as random() does with strings, five at a
+        # time. The reversed number is below 2**53 so is exact as a float
+        upper, lower = np.divmod(tempered[valid], np.uint32(100000))
+        reverse = self._reversed_digits()
+        decimal = reverse[lower]
+        decimal *= 100000
+        decimal += reverse[upper]
+        # Division is correctly rounded, as float() of the decimal string is
+        decimal /= 1e9                          # -> 0.0 to 10.0
+        # decimal %= 2, quicker as each of these steps is exact
+        even = np.floor(decimal * 0.5)
+        even *= 2
+        decimal -= even                         # -> 0.0 to 2.0
+        decimal -= 1.0                          # -> -1.0 to 1.0
+        return decimal
+
+    @classmethod
+    def _reversed_digits(cls):
+        # Table of each five digit number (with leading zeros) reversed
+        if cls._reversed_digits_table is None:
+            number = np.arange(100000, dtype=np.int64)
+            table = np.zeros(100000, dtype=np.int64)
+            for _ in range_(5):
+                table = table * 10 + number % 10
+                number //= 10
+            cls._reversed_digits_table = table.astype(np.float64)
+        return cls._reversed_digits_table
+
+    @classmethod
+    def _twist_array(cls, words, blocks):
+        """
+        Extend a sequence of states by twisting its last state blocks times.
+
+        Word i of the twisted state is word i + m of the state (already
+        twisted if i + m >= n) XORed with a function of words i and i + 1
+        (already twisted if i + 1 == n). Treating the states as one sequence
+        x, x[k + n] depends on x[k], x[k + 1] and x[k + m], so n - m words
+        can be calculated at a time.
+        """
+        n, m = cls.n, cls.m
+        step = n - m
+        # ufuncs of arrays are much quicker than of arrays and numpy scalars
+        upper_mask = np.full(step, cls.upper_mask, dtype=np.uint32)
+        one = np.ones(step, dtype=np.uint32)
+        a = np.full(step, cls.a, dtype=np.uint32)
+        start = len(words) - n
+        stop = len(words) + blocks * n
+        # Pad so that every step calculates n - m words
+        words = np.concatenate(
+            (words, np.zeros(blocks * n + step, dtype=np.uint32)))
+        for k in range_(start, stop - n, step):
+            following = words[k + 1:k + step + 1]
+            # (word & upper_mask) | (following & lower_mask)
+            y = words[k:k + step] ^ following
+            y &= upper_mask
+            y ^= following
+            # y is odd when following is
+            odd = following & one
+            odd *= a
+            y >>= one
+            y ^= odd
+            np.bitwise_xor(words[k + m:k + m + step], y,
+                           out=words[k + n:k + n + step])
+        return words[:stop]
+
+    @classmethod
+    def _temper_array(cls, numbers):
+        u = np.uint32
+        numbers = numbers ^ (numbers >> u(cls.u_shift))
+        numbers ^= (numbers << u(cls.s_shift)) & u(cls.b_mask)
+        numbers ^= (numbers << u(cls.t_shift)) & u(cls.c_mask)
+        numbers ^= numbers >> u(cls.l_shift)
+        return numbers
+
     @staticmethod
     def _int32(number):
         # Get the 32 least significant bits.
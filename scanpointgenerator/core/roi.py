@@ -10,6 +10,8 @@
 
 from annotypes import Serializable
 
+from scanpointgenerator.compat import np
+
 
 class ROI(Serializable):
 
@@ -19,3 +21,68 @@ class ROI(Serializable):
 
     def contains_point(self, point):
         raise NotImplementedError
+
+    def mask_axes(self, points):
+        """
+        Create a mask for each axis separately, for ROIs where mask_points is
+        the AND of the masks of the individual axes
+
+        Args:
+            points (list(np.array)): Positions of each axis, which need not
+                be the same length
+        Returns:
+            list(np.array): Mask of each axis, or None if the ROI can not be
+                separated by axis
+        """
+        return None
+
+    def mask_intervals(self, points, axis):
+        """
+        Find the points kept along each of a set of lines parallel to one
+        axis, for ROIs where these always form a single interval
+
+        Args:
+            points (list(np.array)): Positions of each axis. Those of the
+                given axis must be in ascending order and are shared by every
+                line, the others have a value for each line
+            axis (int): Index of the axis the lines are parallel to
+        Returns:
+            tuple(np.array, np.array): Index of the first kept point and one
+                past the last kept point of each line, or None if the ROI
+                does not give an interval on every line
+        """
+        return None
+
+    def _refine_intervals(self, points, axis, starts, stops):
+        """
+        Correct estimated intervals to exactly those of mask_points, by
+        stepping each end until the point inside it is kept and the point
+        outside it is not. The estimates must be within rounding error of
+        the boundary
+        """
+        line = points[axis]
+        other = points[1 - axis]
+        rows = np.arange(len(other))
+
+        def kept(lines, idx):
+            arrays = [None, None]
+            arrays[axis] = line[idx]
+            arrays[1 - axis] = other[lines]
+            return self.mask_points(arrays).astype(bool)
+
+        # (ends, offset of the tested point, step, move while kept)
+        steps = [(starts, -1, -1, True), (starts, 0, 1, False),
+                 (stops, 0, 1, True), (stops, -1, -1, False)]
+        for ends, offset, step, keep in steps:
+            lines = rows
+            while len(lines):
+                idx = ends[lines] + offset
+                if keep:
+                    lines = lines[(idx >= 0) & (idx < len(line))]
+                else:
+                    lines = lines[starts[lines] < stops[lines]]
+                if len(lines) == 0:
+                    break
+                lines = lines[kept(lines, ends[lines] + offset) == keep]
+                ends[lines] += step
+        return starts, stops
@@ -8,8 +8,11 @@
 
 from annotypes import Anno, Union, Array, Sequence, deserialize_object
 
-from scanpointgenerator.core import Excluder, UExcluderAxes, ROI
-from scanpointgenerator.compat import np
+from scanpointgenerator.core import Excluder, UExcluderAxes, ROI, PackedMask
+from scanpointgenerator.compat import range_, np
+
+# Number of points masked at a time by create_packed_mask, a multiple of 8
+PACKED_MASK_BLOCK_SIZE = 2 ** 20
 
 with Anno("List of regions of interest"):
     ARois = Array[ROI]
@@ -50,3 +53,68 @@ class ROIExcluder(Excluder):
             mask |= roi.mask_points(point_arrays)
 
         return mask
+
+    def create_packed_mask(self, *point_arrays):
+        """Create a mask of the points to exclude with one bit per point.
+
+        The points are masked a block at a time, so neither the mask nor
+        the ROI calculations are held for every point at once.
+
+        Args:
+            *point_arrays (numpy.array(float)): Array of points for each axis
+
+        Returns:
+            PackedMask: Points to exclude, as create_mask
+
+        """
+        l = len(point_arrays[0])
+        for arr in point_arrays:
+            if len(arr) != l:
+                raise ValueError("Points lengths must be equal")
+
+        blocks = [PackedMask.from_mask(self.create_mask(
+            *[arr[start:start + PACKED_MASK_BLOCK_SIZE]
+              for arr in point_arrays]))
+            for start in range_(0, l, PACKED_MASK_BLOCK_SIZE)]
+        if len(blocks) == 0:
+            return PackedMask.ones(0)
+        return PackedMask.concatenate(blocks)
+
+    def create_axis_masks(self, *point_arrays):
+        """Create a mask for each axis separately.
+
+        A union of ROIs is not separable in general, so this is only
+        available for a single ROI that is itself separable.
+
+        Args:
+            *point_arrays (numpy.array(float)): Array of points for each
+                axis, which need not be the same length
+
+        Returns:
+            list(np.array(int8)): Mask of each axis, or None if not separable
+
+        """
+        if len(self.rois) != 1:
+            return None
+        return self.rois[0].mask_axes(point_arrays)
+
+    def create_intervals(self, axis, *point_arrays):
+        """Find the points kept along each line parallel to one axis.
+
+        A union of ROIs may not be a single interval on each line, so this
+        is only available for a single ROI.
+
+        Args:
+            axis (int): Index of the axis the lines are parallel to
+            *point_arrays (numpy.array(float)): Array of points for each
+                axis. Those of the given axis must be in ascending order and
+                are shared by every line, the others have a value per line
+
+        Returns:
+            tuple(np.array, np.array): Index of the first kept point and one
+            past the last kept point of each line, or None if not available
+
+        """
+        if len(self.rois) != 1:
+            return None
+        return self.rois[0].mask_intervals(point_arrays, axis)
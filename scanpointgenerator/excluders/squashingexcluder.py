@@ -6,7 +6,7 @@
 #
 ###
 
-from scanpointgenerator.core import Excluder, UExcluderAxes
+from scanpointgenerator.core import Excluder, UExcluderAxes, PackedMask
 from scanpointgenerator.compat import np
 
 
@@ -39,3 +39,22 @@ class SquashingExcluder(Excluder):
         mask = np.ones_like(point_arrays[0], dtype=np.int8)
 
         return mask
+
+    def create_packed_mask(self, *point_arrays):
+        """Create a mask of the points to exclude with one bit per point.
+
+        All points are included, none are excluded for this excluder.
+
+        Args:
+            *point_arrays (numpy.array(float)): Array of points for each axis
+
+        Returns:
+            PackedMask: Points to exclude, with every point set
+
+        """
+        length = len(point_arrays[0])
+        for arr in point_arrays:
+            if len(arr) != length:
+                raise ValueError("Points lengths must be equal")
+
+        return PackedMask.ones(length)
@@ -9,3 +9,6 @@
 ###
 
 from scanpointgenerator.mutators.randomoffsetmutator import RandomOffsetMutator
+from scanpointgenerator.mutators.affinetransformmutator import \
+    AffineTransformMutator
+from scanpointgenerator.mutators.lookuptablemutator import LookupTableMutator
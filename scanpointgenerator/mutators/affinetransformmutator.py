@@ -0,0 +1,95 @@
+###
+# Copyright (c) 2020 Diamond Light Source Ltd.
+#
+###
+
+from annotypes import Anno, Union, Array, Sequence
+
+from scanpointgenerator.compat import range_, np
+from scanpointgenerator.core import Mutator, Points
+
+with Anno("Axes to transform, in the order of the matrix rows and columns"):
+    AAxes = Array[str]
+UAxes = Union[AAxes, Sequence[str], str]
+with Anno("Transformation matrix of size len(axes) x len(axes), "
+          "flattened in row-major order"):
+    AMatrix = Array[float]
+UMatrix = Union[AMatrix, Sequence[float], Sequence[Sequence[float]]]
+with Anno("Translation added to each axis after the matrix is applied"):
+    ATranslation = Array[float]
+UTranslation = Union[ATranslation, Sequence[float]]
+
+
+@Mutator.register_subclass(
+    "scanpointgenerator:mutator/AffineTransformMutator:1.0")
+class AffineTransformMutator(Mutator):
+    """Mutator to apply an affine transformation, such as a rotation and
+    offset, to the positions and bounds of a set of axes"""
+
+    def __init__(self, axes, matrix, translation=None):
+        # type: (UAxes, UMatrix, UTranslation) -> None
+
+        self.axes = AAxes(axes)
+        self.matrix = AMatrix(np.asarray(matrix, dtype=np.float64).ravel())
+        if translation is None or len(translation) == 0:
+            translation = [0.0] * len(self.axes)
+        self.translation = ATranslation(translation)
+
+        # Validate
+        if len(self.matrix) != len(self.axes) ** 2:
+            raise ValueError("Matrix size (%s) is not the square of the number "
+                             "of axes (%s)" % (len(self.matrix), len(self.axes)))
+        if len(self.translation) != len(self.axes):
+            raise ValueError("Dimensions of axes (%s) and translation (%s) "
+                             "don't match" % (len(self.axes), len(self.translation)))
+
+    def transform(self, vectors):
+        """
+        Apply the transformation to a batch of vectors. The matrix multiply
+        is accumulated column by column over the whole batch rather than
+        with np.dot, so results do not depend on the batch size
+
+        Args:
+            vectors (np.array): Array of shape (len(axes), N) with a column
+                per vector, in the order of axes
+        Returns:
+            np.array: Transformed vectors of the same shape
+        """
+        size = len(self.axes)
+        matrix = np.array(self.matrix.seq, dtype=np.float64).reshape(size, size)
+        translation = np.array(self.translation.seq, dtype=np.float64)
+        transformed = matrix[:, :1] * vectors[:1]
+        for j in range_(1, size):
+            transformed += matrix[:, j:j + 1] * vectors[j:j + 1]
+        transformed += translation[:, np.newaxis]
+        return transformed
+
+    def mutated_axes(self):
+        axes = list(self.axes)
+        return dict(positions=axes, lower=list(axes), upper=list(axes))
+
+    def mutate_in_place(self, points, indices):
+        fields = [points.positions, points.lower, points.upper]
+        length = len(points)
+        # Transform the positions and both bounds as one batch
+        vectors = np.empty((len(self.axes), len(fields) * length))
+        for i, axis in enumerate(self.axes):
+            for j, field in enumerate(fields):
+                vectors[i, j * length:(j + 1) * length] = field[axis]
+        transformed = self.transform(vectors)
+        for i, axis in enumerate(self.axes):
+            for j, field in enumerate(fields):
+                field[axis][...] = transformed[i, j * length:(j + 1) * length]
+
+    def mutate(self, point, idx):
+        if isinstance(point, Points):
+            self.mutate_in_place(point, idx)
+            return point
+        fields = [point.positions, point.lower, point.upper]
+        vectors = np.array([[field[axis] for field in fields]
+                            for axis in self.axes], dtype=np.float64)
+        transformed = self.transform(vectors)
+        for i, axis in enumerate(self.axes):
+            for j, field in enumerate(fields):
+                field[axis] = transformed[i, j]
+        return point
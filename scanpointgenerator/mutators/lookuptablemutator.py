@@ -0,0 +1,66 @@
+###
+# Copyright (c) 2020 Diamond Light Source Ltd.
+#
+###
+
+from annotypes import Anno, Union, Array, Sequence
+
+from scanpointgenerator.compat import np
+from scanpointgenerator.core import Mutator, Points
+
+with Anno("Axis to correct"):
+    AAxis = str
+with Anno("Demanded positions of the calibration table, in increasing order"):
+    ADemand = Array[float]
+UDemand = Union[ADemand, Sequence[float]]
+with Anno("Corrected position for each demanded position"):
+    ACorrected = Array[float]
+UCorrected = Union[ACorrected, Sequence[float]]
+
+
+@Mutator.register_subclass(
+    "scanpointgenerator:mutator/LookupTableMutator:1.0")
+class LookupTableMutator(Mutator):
+    """Mutator to correct the positions and bounds of an axis by linear
+    interpolation of a calibration table. Positions outside the table are
+    given the correction of the nearest end of the table"""
+
+    def __init__(self, axis, demand, corrected):
+        # type: (AAxis, UDemand, UCorrected) -> None
+
+        self.axis = AAxis(axis)
+        self.demand = ADemand(demand)
+        self.corrected = ACorrected(corrected)
+
+        # Validate
+        if len(self.demand) != len(self.corrected):
+            raise ValueError("Dimensions of demand (%s) and corrected (%s) "
+                             "don't match" % (len(self.demand), len(self.corrected)))
+        if len(self.demand) == 0:
+            raise ValueError("Calibration table is empty")
+        if np.any(np.diff(self.demand.seq) <= 0):
+            raise ValueError("Demand positions must be strictly increasing")
+
+    def correct(self, positions):
+        """
+        Args:
+            positions (float or np.array): Demanded positions
+        Returns:
+            float or np.array: Corrected positions
+        """
+        return np.interp(positions, self.demand.seq, self.corrected.seq)
+
+    def mutated_axes(self):
+        return dict(positions=[self.axis], lower=[self.axis], upper=[self.axis])
+
+    def mutate_in_place(self, points, indices):
+        for field in [points.positions, points.lower, points.upper]:
+            field[self.axis][...] = self.correct(field[self.axis])
+
+    def mutate(self, point, idx):
+        if isinstance(point, Points):
+            self.mutate_in_place(point, idx)
+            return point
+        for field in [point.positions, point.lower, point.upper]:
+            field[self.axis] = self.correct(field[self.axis])
+        return point
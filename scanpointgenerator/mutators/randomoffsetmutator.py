@@ -12,7 +12,7 @@ import collections
 from annotypes import Anno, Union, Array, Sequence
 
 from scanpointgenerator.compat import np
-from scanpointgenerator.core import Mutator
+from scanpointgenerator.core import Mutator, Points
 
 with Anno("Seed for random offset generator"):
     ASeed = int
@@ -66,17 +66,73 @@ class RandomOffsetMutator(Mutator):
         x = (x ^ 0xB55A4F09) ^ (x >> 16)
         x &= 0xFFFFFFFF
         # Jython does not like np.float32(x)
-        r = np.array([x], dtype=np.float32)[0]
+        # Divide in double precision so that arrays of indices give the same
+        # offsets as single indices
+        r = np.array([x], dtype=np.float32)[0].astype(np.float64)
         r /= float(0xFFFFFFFF) # r in interval [0, 1]
         r = r * 2 - 1  # r in [-1, 1]
         return m * r
 
+    def calc_offsets(self, axis, indices):
+        """
+        Offsets of an axis at an array of indices, bit-identical to calling
+        calc_offset for each index. The hash is calculated in uint32 arrays,
+        which wrap like the masked int64 arithmetic of calc_offset
+
+        Args:
+            axis (str): Axis to calculate offsets for
+            indices (np.array(int)): Point indices
+        Returns:
+            np.array(float64): Offset at each index
+        """
+        u = np.uint32
+        m = self.max_offset[self.axes.index(axis)]
+        x = (np.asarray(indices, dtype=np.int64) & 0xFFFFFFFF).astype(u)
+        x = (x << u(4)) + u(0 if len(axis) == 0 else ord(axis[0]))
+        x ^= u((self.seed << 12) & 0xFFFFFFFF)
+        x = (x + u(0x7ED55D16)) + (x << u(12))
+        x = (x ^ u(0xC761C23C)) ^ (x >> u(19))
+        x = (x + u(0x165667B1)) + (x << u(5))
+        x = (x + u(0xD3A2646C)) ^ (x << u(9))
+        x = (x + u(0xFD7046C5)) + (x << u(3))
+        x = (x ^ u(0xB55A4F09)) ^ (x >> u(16))
+        r = x.astype(np.float32).astype(np.float64)
+        r /= float(0xFFFFFFFF)
+        r = r * 2 - 1
+        return m * r
+
+    def mutated_axes(self):
+        axes = list(self.axes)
+        return dict(positions=axes, lower=list(axes), upper=list(axes))
+
+    def mutate_in_place(self, points, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        # consecutive indices share neighbours, so hash each index once
+        consecutive = len(indices) and np.all(np.diff(indices) == 1)
+        for axis in self.axes:
+            if consecutive:
+                offsets = self.calc_offsets(
+                    axis, np.arange(indices[0] - 1, indices[-1] + 2))
+                point_offset = offsets[1:-1]
+                low_offset = (offsets[:-2] + point_offset) / 2
+                high_offset = (offsets[2:] + point_offset) / 2
+            else:
+                point_offset = self.calc_offsets(axis, indices)
+                low_offset = (self.calc_offsets(axis, indices-1) + point_offset) / 2
+                high_offset = (self.calc_offsets(axis, indices+1) + point_offset) / 2
+            points.positions[axis] += point_offset
+            points.lower[axis] += low_offset
+            points.upper[axis] += high_offset
+
     def mutate(self, point, idx):
         '''
         In Jython, int bit length conversion does not happen automatically within an array, therefore manually do it
         Jython bitwise operations overflow not extend, so work with 64 bit then reduce after calculation
         Jython also does not allow dtype(x), so must wrap in array
         '''
+        if isinstance(point, Points):
+            self.mutate_in_place(point, idx)
+            return point
         idx = np.array([idx], dtype=np.int64)[0]
         for axis in self.axes:
             point_offset = self.calc_offset(axis, idx)
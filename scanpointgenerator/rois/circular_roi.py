@@ -10,6 +10,7 @@
 from annotypes import Anno, Union, Array, Sequence
 
 from scanpointgenerator.core import ROI
+from scanpointgenerator.compat import np
 import math as m
 
 with Anno("The centre of circle"):
@@ -50,3 +51,14 @@ class CircularROI(ROI):
         x += y
         r2 = self.radius * self.radius
         return x <= r2
+
+    def mask_intervals(self, points, axis):
+        other = points[1 - axis].copy()
+        other -= self.centre[1 - axis]
+        other *= other
+        r2 = self.radius * self.radius
+        half = np.sqrt(np.maximum(r2 - other, 0))
+        centre = self.centre[axis]
+        starts = np.searchsorted(points[axis], centre - half)
+        stops = np.searchsorted(points[axis], centre + half, side="right")
+        return self._refine_intervals(points, axis, starts, stops)
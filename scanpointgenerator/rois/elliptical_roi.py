@@ -11,6 +11,7 @@ from annotypes import Anno, Union, Array, Sequence
 from math import cos, sin
 
 from scanpointgenerator.core import ROI
+from scanpointgenerator.compat import np
 
 with Anno("The centre of ellipse"):
     ACentre = Array[float]
@@ -68,3 +69,18 @@ class EllipticalROI(ROI):
         y /= ry2
         x += y
         return x <= 1
+
+    def mask_intervals(self, points, axis):
+        # a rotated ellipse also gives an interval on each line, but rounding
+        # of the rotated coordinates may not
+        if self.angle != 0:
+            return None
+        other = points[1 - axis].copy()
+        other -= self.centre[1 - axis]
+        other *= other
+        other /= self.semiaxes[1 - axis] * self.semiaxes[1 - axis]
+        half = self.semiaxes[axis] * np.sqrt(np.maximum(1 - other, 0))
+        centre = self.centre[axis]
+        starts = np.searchsorted(points[axis], centre - half)
+        stops = np.searchsorted(points[axis], centre + half, side="right")
+        return self._refine_intervals(points, axis, starts, stops)
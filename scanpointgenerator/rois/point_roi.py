@@ -38,3 +38,13 @@ class PointROI(ROI):
         y *= y
         x += y
         return x <= epsilon * epsilon
+
+    def mask_axes(self, points):
+        # x * x + y * y <= 0 exactly when both squares are zero
+        x = points[0].copy()
+        x -= self.point[0]
+        y = points[1].copy()
+        y -= self.point[1]
+        x *= x
+        y *= y
+        return [x <= 0, y <= 0]
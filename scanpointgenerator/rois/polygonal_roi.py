@@ -9,7 +9,13 @@
 from annotypes import Anno, Union, Array, Sequence
 
 from scanpointgenerator.core import ROI
-from scanpointgenerator.compat import np
+from scanpointgenerator.compat import range_, np
+
+# Number of vertices from which mask_points finds the edges crossing each
+# point's scanline, rather than testing every point against every edge
+SCANLINE_MIN_VERTICES = 16
+# Maximum number of points tested against their scanline's edges at once
+SCANLINE_BLOCK_SIZE = 2 ** 18
 
 with Anno("x positions for polygon vertices"):
     APointsX = Array[float]
@@ -51,6 +57,8 @@ class PolygonalROI(ROI):
         return inside
 
     def mask_points(self, points):
+        if len(self.points_x) >= SCANLINE_MIN_VERTICES:
+            return self._mask_scanlines(points)
         x = points[0]
         y = points[1]
         v1x, v1y = self.points_x[-1], self.points_y[-1]
@@ -66,3 +74,57 @@ class PolygonalROI(ROI):
                 mask ^= vmask
             v1x, v1y = v2x, v2y
         return mask
+
+    def _mask_scanlines(self, points):
+        # As mask_points, but only testing each point against the edges
+        # that cross its scanline rather than against every edge
+        x = np.asarray(points[0])
+        y = np.asarray(points[1])
+        vx = np.array(self.points_x.seq, dtype=np.float64)
+        vy = np.array(self.points_y.seq, dtype=np.float64)
+        # edges run from each vertex's predecessor, skipping horizontal edges
+        v1x, v1y = np.roll(vx, 1), np.roll(vy, 1)
+        sloped = vy != v1y
+        v1x, v1y, v2x, v2y = v1x[sloped], v1y[sloped], vx[sloped], vy[sloped]
+        # vertex values meet the points in the type a scalar vertex would
+        dtype = np.result_type(x, y, 0.)
+        dx, dy = (v2x - v1x).astype(dtype), (v2y - v1y).astype(dtype)
+        v1x, v1y, v2y = v1x.astype(dtype), v1y.astype(dtype), v2y.astype(dtype)
+        vy = vy.astype(dtype)
+
+        # Between consecutive vertex y values the edges crossing a scanline
+        # do not change, so list the edges crossing each of these slabs
+        slab_y = np.unique(vy)
+        first_slab = np.searchsorted(slab_y, np.minimum(v1y, v2y))
+        end_slab = np.searchsorted(slab_y, np.maximum(v1y, v2y))
+        spans = end_slab - first_slab
+        offsets = np.cumsum(spans) - spans
+        edge_slabs = np.arange(spans.sum()) - np.repeat(offsets, spans) + \
+            np.repeat(first_slab, spans)
+        slab_edges = np.repeat(np.arange(len(spans)), spans)
+        slab_edges = slab_edges[np.argsort(edge_slabs, kind="mergesort")]
+        slab_offsets = np.searchsorted(
+            np.sort(edge_slabs), np.arange(len(slab_y)))
+
+        mask = np.full(len(x), False, dtype=np.int8)
+        for start in range_(0, len(x), SCANLINE_BLOCK_SIZE):
+            bx = x[start:start + SCANLINE_BLOCK_SIZE]
+            by = y[start:start + SCANLINE_BLOCK_SIZE]
+            # points below or above every vertex (or nan) cross no edges
+            slab = np.searchsorted(slab_y, by, side="right") - 1
+            slab[slab >= len(slab_y) - 1] = -1
+            counts = np.where(slab >= 0, slab_offsets[slab + 1] -
+                              slab_offsets[np.maximum(slab, 0)], 0)
+            if counts.sum() == 0:
+                continue
+            firsts = np.cumsum(counts) - counts
+            point = np.repeat(np.arange(len(by)), counts)
+            edge = slab_edges[np.arange(counts.sum()) -
+                              np.repeat(firsts, counts) +
+                              np.repeat(slab_offsets[slab], counts)]
+            # count crossings to the right of each point, as each edge would
+            t = (by[point] - v1y[edge]) / dy[edge]
+            crossed = bx[point] < v1x[edge] + t * dx[edge]
+            crossings = np.bincount(point[crossed], minlength=len(by))
+            mask[start:start + SCANLINE_BLOCK_SIZE] = crossings % 2
+        return mask
@@ -66,3 +66,14 @@ class RectangularROI(ROI):
         mask_x = np.logical_and(x >= 0, x <= self.width)
         mask_y = np.logical_and(y >= 0, y <= self.height)
         return np.logical_and(mask_x, mask_y)
+
+    def mask_axes(self, points):
+        if self.angle != 0:
+            return None
+        x = points[0].copy()
+        x -= self.start[0]
+        y = points[1].copy()
+        y -= self.start[1]
+        mask_x = np.logical_and(x >= 0, x <= self.width)
+        mask_y = np.logical_and(y >= 0, y <= self.height)
+        return [mask_x, mask_y]
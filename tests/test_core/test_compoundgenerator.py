@@ -2,6 +2,9 @@ import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 import unittest
+import json
+import shutil
+import tempfile
 
 from test_util import ScanPointGeneratorTest
 from scanpointgenerator import CompoundGenerator, Mutator, Generator, Excluder
@@ -11,6 +14,7 @@ from scanpointgenerator import LissajousGenerator
 from scanpointgenerator import StaticPointGenerator
 from scanpointgenerator import ROIExcluder
 from scanpointgenerator import SquashingExcluder
+from scanpointgenerator import PrepareCache
 from scanpointgenerator.rois import CircularROI, RectangularROI, EllipticalROI, SectorROI, PolygonalROI
 from scanpointgenerator.mutators import RandomOffsetMutator
 from scanpointgenerator.compat import range_, np
@@ -1418,6 +1422,224 @@ class CompoundGeneratorInternalDataTests(ScanPointGeneratorTest):
         expected_mask = [x*x + y*y <= 1 for (x, y) in p]
         self.assertEqual(expected_mask, g.dimensions[0].mask.tolist())
 
+    @patch("scanpointgenerator.core.dimension.STREAMING_BLOCK_SIZE", 7)
+    def test_streaming_masks(self):
+        tg = LineGenerator("t", "mm", 1, 5, 5)
+        zg = LineGenerator("z", "mm", 0, 4, 5, alternate=True)
+        yg = LineGenerator("y", "mm", 1, 5, 5, alternate=True)
+        xg = LineGenerator("x", "mm", 2, 6, 5, alternate=True)
+        r1 = CircularROI([4., 4.], 1.5)
+        e1 = ROIExcluder([r1], ["y", "x"])
+        e2 = ROIExcluder([r1], ["z", "y"])
+        e3 = SquashingExcluder(["t", "z"])
+        expected = CompoundGenerator([tg, zg, yg, xg], [e1, e2], [])
+        expected.prepare()
+        g = CompoundGenerator([tg, zg, yg, xg], [e1, e2, e3], [])
+        g.prepare(streaming=True)
+
+        self.assertEqual(expected.size, g.size)
+        self.assertEqual(1, len(g.dimensions))
+        self.assertIsNone(g.dimensions[0].mask)
+        self.assertEqual(np.uint32, g.dimensions[0].indices.dtype)
+        for n in range_(g.size):
+            p, q = expected.get_point(n), g.get_point(n)
+            self.assertEqual(p.positions, q.positions)
+            self.assertEqual(p.lower, q.lower)
+            self.assertEqual(p.upper, q.upper)
+
+    def test_compress(self):
+        def make_generator():
+            zg = LineGenerator("z", "mm", 0, 4, 5)
+            yg = LineGenerator("y", "mm", 0, 4, 9, alternate=True)
+            xg = LineGenerator("x", "mm", 0, 4, 11, alternate=True)
+            e1 = ROIExcluder([CircularROI([2, 2], 1.8)], ["x", "y"])
+            e2 = ROIExcluder([PolygonalROI([0, 4, 0], [0, 0, 4])], ["z", "y"])
+            return CompoundGenerator([zg, yg, xg], [e1, e2], [],
+                                     continuous=True)
+
+        expected = make_generator()
+        expected.prepare()
+        g = make_generator()
+        g.prepare(compress=True)
+
+        self.assertEqual(expected.shape, g.shape)
+        dim = g.dimensions[0]
+        self.assertLess(dim.indices.runs, dim.size)
+        self.assertEqual(
+            expected.dimensions[0].indices.tolist(), dim.indices.tolist())
+        self.assertEqual(expected.dimensions[0].mask.tolist(), dim.mask.tolist())
+        for n in range_(g.size):
+            p, q = expected.get_point(n), g.get_point(n)
+            self.assertEqual(p.positions, q.positions)
+            self.assertEqual(p.lower, q.lower)
+            self.assertEqual(p.upper, q.upper)
+            self.assertEqual(p.indexes, q.indexes)
+        for start, stop in [(0, g.size), (3, 17), (g.size - 1, 2)]:
+            p, q = expected.get_points(start, stop), g.get_points(start, stop)
+            for axis in ["x", "y", "z"]:
+                self.assertEqual(
+                    p.positions[axis].tolist(), q.positions[axis].tolist())
+                self.assertEqual(p.lower[axis].tolist(), q.lower[axis].tolist())
+                self.assertEqual(p.upper[axis].tolist(), q.upper[axis].tolist())
+
+    def test_compress_intervals_without_indices(self):
+        yg = LineGenerator("y", "mm", 0, 1, 200)
+        xg = LineGenerator("x", "mm", 0, 1, 300, alternate=True)
+        e = ROIExcluder([EllipticalROI([0.5, 0.5], [0.5, 0.3])], ["x", "y"])
+        g = CompoundGenerator([yg, xg], [e], [])
+        with patch("scanpointgenerator.core.dimension.IntervalIndex."
+                   "from_indices") as from_indices:
+            g.prepare(compress=True)
+        from_indices.assert_not_called()
+        expected = CompoundGenerator([yg, xg], [e], [])
+        expected.prepare()
+        self.assertEqual(expected.size, g.size)
+        # a single run for each row
+        rows = np.unique(expected.dimensions[0].get_mesh_map("y"))
+        self.assertEqual(len(rows), g.dimensions[0].indices.runs)
+        for n in [0, 1, 299, 300, g.size // 2, g.size - 1]:
+            p, q = expected.get_point(n), g.get_point(n)
+            self.assertEqual(p.positions, q.positions)
+            self.assertEqual(p.lower, q.lower)
+
+    def test_prepare_workers(self):
+        def make_generator():
+            ag = LineGenerator("a", "mm", 0, 4, 5)
+            bg = LineGenerator("b", "mm", 0, 4, 6)
+            xg = LineGenerator("x", "mm", 0, 4, 7, alternate=True)
+            yg = LineGenerator("y", "mm", 0, 4, 8, alternate=True)
+            e1 = ROIExcluder([CircularROI([2, 2], 1.5)], ["a", "b"])
+            e2 = ROIExcluder([EllipticalROI([2, 2], [2, 1])], ["x", "y"])
+            return CompoundGenerator([ag, bg, yg, xg], [e1, e2], [])
+
+        expected = make_generator()
+        expected.prepare()
+        g = make_generator()
+        g.prepare(workers=3)
+        self.assertEqual(expected.shape, g.shape)
+        self.assertEqual(2, len(g.dimensions))
+        for n in range_(g.size):
+            p, q = expected.get_point(n), g.get_point(n)
+            self.assertEqual(p.positions, q.positions)
+            self.assertEqual(p.lower, q.lower)
+            self.assertEqual(p.upper, q.upper)
+            self.assertEqual(p.indexes, q.indexes)
+
+    def test_prepare_workers_raises(self):
+        x = LineGenerator("x", "mm", 0, 1, 3)
+        y = LineGenerator("y", "mm", 0, 1, 3)
+        e = ROIExcluder([CircularROI([5, 5], 1)], ["x", "y"])
+        g = CompoundGenerator([y, x], [e], [])
+        with self.assertRaises(ValueError):
+            g.prepare(workers=2)
+
+    def test_prepare_cache(self):
+        def make_generator(radius=1.5):
+            xg = LineGenerator("x", "mm", 0, 4, 5, alternate=True)
+            yg = LineGenerator("y", "mm", 0, 4, 6)
+            e = ROIExcluder([CircularROI([2, 2], radius)], ["x", "y"])
+            return CompoundGenerator([yg, xg], [e], [], 0.1)
+
+        cache = PrepareCache(maxsize=1)
+        with patch.object(CompoundGenerator, "prepare_cache", cache):
+            g1 = make_generator()
+            g1.prepare()
+            self.assertEqual((0, 1, 1, 1), cache.info())
+            g2 = CompoundGenerator.from_dict(g1.to_dict())
+            g2.prepare()
+            self.assertEqual((1, 1, 1, 1), cache.info())
+            self.assertIs(g1.dimensions[0], g2.dimensions[0])
+            for gen1, gen2 in zip(g1.generators, g2.generators):
+                self.assertIsNot(gen1, gen2)
+                self.assertEqual(
+                    gen1.positions[gen1.axes[0]].tolist(),
+                    gen2.positions[gen2.axes[0]].tolist())
+            self.assertEqual(
+                g1.generators[-1].bounds["x"].tolist(),
+                g2.generators[-1].bounds["x"].tolist())
+            self.assertEqual(g1.size, g2.size)
+            self.assertEqual(g1.shape, g2.shape)
+            for n in range_(g1.size):
+                self.assertEqual(
+                    g1.get_point(n).positions, g2.get_point(n).positions)
+            # different parameters and excluders miss
+            make_generator().prepare(lazy=True)
+            make_generator(2.0).prepare()
+            self.assertEqual((1, 3, 1, 1), cache.info())
+            # g1 has been evicted
+            make_generator().prepare()
+            self.assertEqual((1, 4, 1, 1), cache.info())
+            cache.clear()
+            self.assertEqual((0, 0, 1, 0), cache.info())
+
+    def test_save_and_load_prepared(self):
+        def make_generator(radius=1.5):
+            zg = LineGenerator("z", "mm", 0, 1, 2)
+            xg = LineGenerator("x", "mm", 0, 4, 5, alternate=True)
+            yg = LineGenerator("y", "mm", 0, 4, 6, alternate=True)
+            e = ROIExcluder([CircularROI([2, 2], radius)], ["x", "y"])
+            return CompoundGenerator([zg, yg, xg], [e], [], 0.1)
+
+        path = tempfile.mkdtemp()
+        try:
+            g = make_generator()
+            g.prepare(lazy=True)
+            g.save_prepared(path)
+            loaded = make_generator()
+            loaded.load_prepared(path)
+            self.assertEqual(g.shape, loaded.shape)
+            self.assertEqual(g.size, loaded.size)
+            self.assertIsInstance(
+                loaded.dimensions[1].positions["x"], np.memmap)
+            for n in range_(g.size):
+                p, q = g.get_point(n), loaded.get_point(n)
+                self.assertEqual(p.positions, q.positions)
+                self.assertEqual(p.lower, q.lower)
+                self.assertEqual(p.upper, q.upper)
+                self.assertEqual(p.indexes, q.indexes)
+            self.assertEqual(
+                g.get_points(0, g.size).indexes.tolist(),
+                loaded.get_points(0, loaded.size).indexes.tolist())
+
+            with self.assertRaises(ValueError):
+                make_generator(2.0).load_prepared(path)
+            meta_file = os.path.join(path, "prepared.json")
+            with open(meta_file) as f:
+                meta = json.load(f)
+            meta["version"] = 0
+            with open(meta_file, "w") as f:
+                json.dump(meta, f)
+            with self.assertRaises(ValueError):
+                make_generator().load_prepared(path)
+        finally:
+            shutil.rmtree(path)
+
+    def test_prepare_cache_keys_memmap_dir(self):
+        def make_generator():
+            xg = LineGenerator("x", "mm", 0, 4, 5, alternate=True)
+            yg = LineGenerator("y", "mm", 0, 4, 6)
+            e = ROIExcluder([CircularROI([2, 2], 1.5)], ["x", "y"])
+            return CompoundGenerator([yg, xg], [e], [], 0.1)
+
+        cache = PrepareCache()
+        paths = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        try:
+            with patch.object(CompoundGenerator, "prepare_cache", cache):
+                make_generator().prepare(memmap=True, memmap_dir=paths[0])
+                make_generator().prepare(memmap=True, memmap_dir=paths[1])
+                self.assertEqual((0, 2, 16, 2), cache.info())
+        finally:
+            for path in paths:
+                shutil.rmtree(path)
+
+    def test_prepare_key_unserializable_raises_type_error(self):
+        g = CompoundGenerator([LineGenerator("x", "mm", 0, 1, 2)], [], [])
+        with self.assertRaises(TypeError):
+            g._prepare_key(value=object())
+
+    def test_prepare_cache_disabled_by_default(self):
+        self.assertIsNone(CompoundGenerator.prepare_cache)
+
 
 class TestSerialisation(unittest.TestCase):
 
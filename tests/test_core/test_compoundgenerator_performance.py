@@ -3,6 +3,7 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 import unittest
 import time
+import timeit
 
 from test_util import ScanPointGeneratorTest
 from scanpointgenerator import CompoundGenerator
@@ -11,6 +12,16 @@ from scanpointgenerator import SpiralGenerator
 from scanpointgenerator import ROIExcluder
 from scanpointgenerator.rois import CircularROI
 from scanpointgenerator.mutators import RandomOffsetMutator
+from scanpointgenerator.core.point import Point
+from scanpointgenerator.core.dimension import IntervalIndex, _IntervalAxis, \
+    _ProductAxis
+from scanpointgenerator.compat import range_
+
+try:
+    import tracemalloc
+except ImportError:
+    # not available on Python 2 or Jython
+    tracemalloc = None
 
 # Test 20 million points on Jython (Travis runs out of memory at 200 million)
 ZSIZE = 10 if os.name == "java" else 100
@@ -18,24 +29,66 @@ ZSIZE = 10 if os.name == "java" else 100
 # for 200 million points, but Travis VMs are sometimes quite weak.
 # Jython gets less time because it's doing fewer points (but around 3 times slower)
 TIMELIMIT = 8 if os.name == "java" else 16
+# Timings depend on the machine, so are only checked when this is set
+BENCHMARK = bool(os.environ.get("SCANPOINTGENERATOR_BENCHMARK"))
+
+
+def make_200_million_generator():
+    s = SpiralGenerator(
+        ["x", "y"], "mm", [0, 0], 6, 0.02, True) # ~2e5 points
+    z = LineGenerator("z", "mm", 0, 1, ZSIZE, True) #1e2 points or 1e1 for Jython
+    w = LineGenerator("w", "mm", 0, 1, 10, True) #1e1 points
+    r1 = CircularROI([-0.7, 4], 0.5)
+    r2 = CircularROI([0.5, 0.5], 0.3)
+    r3 = CircularROI([0.2, 4], 0.5)
+    e1 = ROIExcluder([r1], ["x", "y"])
+    e2 = ROIExcluder([r2], ["w", "z"])
+    e3 = ROIExcluder([r3], ["z", "y"])
+    om = RandomOffsetMutator(0, ["x", "y"], [0.2, 0.2])
+    return CompoundGenerator([w, z, s], [e1, e3, e2], [om])
+
 
 class CompoundGeneratorPerformanceTest(ScanPointGeneratorTest):
-    @unittest.skip("Unsuitable")
+    def test_200_million_compressed(self):
+        g = make_200_million_generator()
+        if tracemalloc is not None:
+            tracemalloc.start()
+        try:
+            g.prepare(compress=True) # g.size ~3e5
+            if tracemalloc is not None:
+                peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if tracemalloc is not None:
+                tracemalloc.stop()
+
+        self.assertEqual(1, len(g.dimensions))
+        dim = g.dimensions[0]
+        dim_size = 1
+        for gen in dim.generators:
+            dim_size *= gen.size
+        # the product is never masked or held point by point
+        if tracemalloc is not None:
+            self.assertLess(peak, dim_size)
+        self.assertIsInstance(dim.indices, IntervalIndex)
+        self.assertLess(dim.indices.nbytes, g.size * 4)
+        for axis in ["w", "z", "x", "y"]:
+            self.assertIsInstance(dim.positions[axis], _IntervalAxis)
+            self.assertIsInstance(dim.positions[axis].source, _ProductAxis)
+        for axis in ["x", "y"]:
+            self.assertIsInstance(dim.lower_bounds[axis], _IntervalAxis)
+            self.assertIsInstance(dim.upper_bounds[axis], _IntervalAxis)
+
+        points = g.get_points(g.size - 10, g.size)
+        for i, n in enumerate(range_(g.size - 10, g.size)):
+            point = g.get_point(n)
+            for axis in ["w", "z", "x", "y"]:
+                self.assertEqual(point.positions[axis], points.positions[axis][i])
+
+    @unittest.skipUnless(BENCHMARK, "SCANPOINTGENERATOR_BENCHMARK not set")
     def test_200_million_time_constraint(self):
         start_time = time.time()
 
-        s = SpiralGenerator(
-            ["x", "y"], "mm", [0, 0], 6, 0.02, True) # ~2e5 points
-        z = LineGenerator("z", "mm", 0, 1, ZSIZE, True) #1e2 points or 1e1 for Jython
-        w = LineGenerator("w", "mm", 0, 1, 10, True) #1e1 points
-        r1 = CircularROI([-0.7, 4], 0.5)
-        r2 = CircularROI([0.5, 0.5], 0.3)
-        r3 = CircularROI([0.2, 4], 0.5)
-        e1 = ROIExcluder([r1], ["x", "y"])
-        e2 = ROIExcluder([r2], ["w", "z"])
-        e3 = ROIExcluder([r3], ["z", "y"])
-        om = RandomOffsetMutator(0, ["x", "y"], [0.2, 0.2])
-        g = CompoundGenerator([w, z, s], [e1, e3, e2], [om])
+        g = make_200_million_generator()
         g.prepare() # g.size ~3e5
 
         end_time = time.time()
@@ -50,5 +103,57 @@ class CompoundGeneratorPerformanceTest(ScanPointGeneratorTest):
         ## point objects are quite expensive to create
         #self.assertLess(end_time - start_time, 20)
 
+    def test_get_point_plan_faster_than_dimension_lookup(self):
+        def get_point_by_dimension(g, n):
+            # get_point before the lookup plan was compiled in prepare
+            point = Point()
+            for dim in g.dimensions:
+                k = int(n // g._dim_meta[dim]["repeat"])
+                dim_runs = k // dim.size
+                dim_idx = k % dim.size
+                dim_in_reverse = dim.alternate and dim_runs % 2 == 1
+                if dim_in_reverse:
+                    dim_idx = dim.size - dim_idx - 1
+                dim_positions = dim.get_point(dim_idx)
+                point.positions.update(dim_positions)
+                if dim is g.dimensions[-1]:
+                    lower, upper = dim.get_bounds(dim_idx, dim_in_reverse)
+                    point.lower.update(lower)
+                    point.upper.update(upper)
+                else:
+                    point.lower.update(dim_positions)
+                    point.upper.update(dim_positions)
+                point.indexes.append(dim_idx)
+            point.duration = g.duration
+            point.delay_after = g.delay_after
+            return point
+
+        z = LineGenerator("z", "mm", 0, 1, 10, True)
+        y = LineGenerator("y", "mm", 0, 1, 100, True)
+        x = LineGenerator("x", "mm", 0, 1, 100, True)
+        g = CompoundGenerator([z, y, x], [], [])
+        g.prepare()
+        indices = range(0, g.size, 7)
+        expected = [get_point_by_dimension(g, n) for n in indices[:100]]
+        # get_point only walks the plan compiled in prepare
+        dim_meta, g._dim_meta = g._dim_meta, None
+        dimensions, g.dimensions = g.dimensions, None
+        for n, expected_point in zip(indices[:100], expected):
+            point = g.get_point(n)
+            self.assertEqual(expected_point.positions, point.positions)
+            self.assertEqual(expected_point.lower, point.lower)
+            self.assertEqual(expected_point.upper, point.upper)
+            self.assertEqual(expected_point.indexes, point.indexes)
+        g._dim_meta, g.dimensions = dim_meta, dimensions
+        if not BENCHMARK:
+            return
+
+        by_dimension = min(timeit.repeat(
+            lambda: [get_point_by_dimension(g, n) for n in indices],
+            number=1, repeat=3))
+        planned = min(timeit.repeat(
+            lambda: [g.get_point(n) for n in indices], number=1, repeat=3))
+        self.assertLess(planned, by_dimension)
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
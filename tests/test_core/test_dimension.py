@@ -2,14 +2,20 @@ import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 import unittest
+import shutil
+import tempfile
 
 from test_util import ScanPointGeneratorTest
 from scanpointgenerator.compat import np
-from scanpointgenerator.core.dimension import Dimension
+from scanpointgenerator.core import PackedMask
+from scanpointgenerator.core.dimension import Dimension, IntervalIndex
+from scanpointgenerator.excluders import ROIExcluder
+from scanpointgenerator.rois import CircularROI, EllipticalROI, \
+    RectangularROI
 
 from pkg_resources import require
 require("mock")
-from mock import Mock
+from mock import Mock, patch
 
 
 class DimensionTests(ScanPointGeneratorTest):
@@ -427,6 +433,392 @@ class DimensionTests(ScanPointGeneratorTest):
             d = Dimension([g1, g2])
 
 
+    def test_prepare_lazy_matches_prepare(self):
+        def make_generators():
+            g1 = Mock(
+                    axes=["x"],
+                    positions={"x":np.array([1., 2., 3.])},
+                    size=3,
+                    alternate=False)
+            g2 = Mock(
+                    axes=["y", "z"],
+                    positions={"y":np.array([4., 5.]), "z":np.array([6., 7.])},
+                    size=2,
+                    alternate=True)
+            g3 = Mock(
+                    axes=["w"],
+                    positions={"w":np.array([0., 1., 2., 3.])},
+                    bounds={"w":np.array([-0.5, 0.5, 1.5, 2.5, 3.5])},
+                    size=4,
+                    alternate=True)
+            return [g1, g2, g3]
+
+        d = Dimension(make_generators())
+        d.prepare()
+        lazy = Dimension(make_generators())
+        lazy.prepare(lazy=True)
+
+        self.assertEqual(d.size, lazy.size)
+        self.assertIsNone(lazy.mask)
+        for axis in ["x", "y", "z", "w"]:
+            self.assertEqual(
+                d.positions[axis].tolist(), lazy.positions[axis].tolist())
+            self.assertEqual(
+                d.lower_bounds[axis].tolist(), lazy.lower_bounds[axis].tolist())
+            self.assertEqual(
+                d.upper_bounds[axis].tolist(), lazy.upper_bounds[axis].tolist())
+            self.assertEqual(
+                d.positions[axis][5:17:3].tolist(),
+                lazy.positions[axis][5:17:3].tolist())
+            self.assertEqual(d.positions[axis][-1], lazy.positions[axis][-1])
+        for idx in range(d.size):
+            self.assertEqual(d.get_point(idx), lazy.get_point(idx))
+            self.assertEqual(d.get_bounds(idx, True), lazy.get_bounds(idx, True))
+        self.assertEqual(
+            d.get_mesh_map("y").tolist(), lazy.get_mesh_map("y").tolist())
+
+    @patch("scanpointgenerator.core.dimension.STREAMING_BLOCK_SIZE", 5)
+    def test_prepare_memmap(self):
+        g1 = Mock(
+                axes=["x"],
+                positions={"x":np.array([0., 1., 2.])},
+                size=3,
+                alternate=False)
+        g2 = Mock(
+                axes=["y"],
+                positions={"y":np.array([10., 11., 12., 13.])},
+                bounds={"y":np.array([9.5, 10.5, 11.5, 12.5, 13.5])},
+                size=4,
+                alternate=True)
+        def create_mask(x, y):
+            return ((x * 10 + y) % 3 != 0).astype(np.int8)
+        e = Mock(axes=["x", "y"], create_mask=Mock(side_effect=create_mask))
+        d = Dimension([g1, g2], [e])
+        d.prepare()
+        e.create_mask.reset_mock()
+        path = tempfile.mkdtemp()
+        try:
+            mapped = Dimension([g1, g2], [e])
+            with patch.object(Dimension, "_prepare_dense",
+                              side_effect=AssertionError("product was built")):
+                mapped.prepare(memmap=True, memmap_dir=path)
+            self.assertEqual([], os.listdir(path))
+        finally:
+            shutil.rmtree(path)
+
+        # the product is masked a block at a time rather than in full
+        self.assertEqual(
+            [4, 4, 4], [len(c[0][0]) for c in e.create_mask.call_args_list])
+        self.assertEqual(d.size, mapped.size)
+        self.assertEqual(d.mask.tolist(), mapped.mask.tolist())
+        for axis in ["x", "y"]:
+            self.assertIsInstance(mapped.positions[axis], np.memmap)
+            self.assertIsInstance(mapped.lower_bounds[axis], np.memmap)
+            self.assertEqual(
+                d.positions[axis].tolist(), mapped.positions[axis].tolist())
+            self.assertEqual(
+                d.lower_bounds[axis].tolist(),
+                mapped.lower_bounds[axis].tolist())
+            self.assertEqual(
+                d.upper_bounds[axis].tolist(),
+                mapped.upper_bounds[axis].tolist())
+
+    def test_prepare_lazy_with_mask_is_not_lazy(self):
+        g = Mock(
+                axes=["x"],
+                positions={"x":np.array([0, 1, 2])},
+                bounds={"x":np.array([-0.5, 0.5, 1.5, 2.5])},
+                size=3,
+                alternate=False)
+        mask = np.array([1, 0, 1], dtype=np.int8)
+        e = Mock(axes=["x"], create_mask=Mock(return_value=mask))
+        d = Dimension([g], [e])
+        d.prepare(lazy=True)
+        self.assertEqual(mask.tolist(), d.mask.tolist())
+        self.assertEqual([0, 2], d.positions["x"].tolist())
+
+    def test_prepare_combines_packed_masks(self):
+        g = Mock(
+                axes=["x", "y"],
+                positions={"x":np.array([0., 1., 2., 3.]),
+                           "y":np.array([0., 1., 2., 3.])},
+                bounds={"x":np.array([-0.5, 0.5, 1.5, 2.5, 3.5]),
+                        "y":np.array([-0.5, 0.5, 1.5, 2.5, 3.5])},
+                size=4,
+                alternate=False)
+        e1 = ROIExcluder([CircularROI([0, 0], 2), CircularROI([3, 3], 1)],
+                         ["x", "y"])
+        e2 = Mock(axes=["x"],
+                  create_mask=Mock(return_value=np.array([1, 1, 0, 1])))
+        d = Dimension([g], [e1, e2])
+        with patch.object(PackedMask, "unpack") as unpack:
+            unpack.side_effect = AssertionError("mask was unpacked")
+            d.prepare()
+
+        self.assertIsInstance(d.mask, PackedMask)
+        self.assertEqual([1, 1, 0, 1], d.mask.tolist())
+        self.assertEqual([0, 1, 3], d.indices.tolist())
+        self.assertEqual([0., 1., 3.], d.positions["x"].tolist())
+
+    def test_prepare_separable_matches_prepare(self):
+        def make_generators():
+            g1 = Mock(
+                    axes=["x"],
+                    positions={"x":np.array([3., 1., 2., 0.])},
+                    size=4,
+                    alternate=False)
+            g2 = Mock(
+                    axes=["y", "z"],
+                    positions={"y":np.array([4., 5., 6.]),
+                               "z":np.array([6., 7., 8.])},
+                    size=3,
+                    alternate=True)
+            g3 = Mock(
+                    axes=["w"],
+                    positions={"w":np.array([0., 1., 2., 3., 4.])},
+                    bounds={"w":np.array([-0.5, 0.5, 1.5, 2.5, 3.5, 4.5])},
+                    size=5,
+                    alternate=True)
+            return [g1, g2, g3]
+
+        def dense(excluder):
+            # evaluated over the full product, as it is not an ROIExcluder
+            return Mock(axes=excluder.axes,
+                        create_mask=Mock(side_effect=excluder.create_mask))
+
+        e1 = ROIExcluder([RectangularROI([0.5, 0.5], 3, 3)], ["x", "w"])
+        e2 = ROIExcluder([RectangularROI([4, 6], 1.5, 2)], ["y", "z"])
+        e3 = ROIExcluder([CircularROI([2, 2], 2)], ["x", "w"])
+        d = Dimension(make_generators(), [dense(e1), dense(e2), dense(e3)])
+        d.prepare()
+        with patch.object(RectangularROI, "mask_points") as mask_points:
+            separable = Dimension(make_generators(), [e1, e2, e3])
+            separable.prepare()
+        mask_points.assert_not_called()
+
+        self.assertEqual(d.indices.tolist(), separable.indices.tolist())
+        self.assertEqual(d.mask.tolist(), separable.mask.tolist())
+        for axis in ["x", "y", "z", "w"]:
+            self.assertEqual(
+                d.positions[axis].tolist(), separable.positions[axis].tolist())
+            self.assertEqual(
+                d.lower_bounds[axis].tolist(),
+                separable.lower_bounds[axis].tolist())
+            self.assertEqual(
+                d.upper_bounds[axis].tolist(),
+                separable.upper_bounds[axis].tolist())
+        self.assertEqual(
+            d.get_mesh_map("y").tolist(), separable.get_mesh_map("y").tolist())
+
+    def test_prepare_intervals_matches_prepare(self):
+        def make_generators():
+            g1 = Mock(
+                    axes=["x"],
+                    positions={"x":np.array([3., 1., 2., 0., 4.])},
+                    size=5,
+                    alternate=False)
+            g2 = Mock(
+                    axes=["y"],
+                    positions={"y":np.array([5., 4., 3., 2., 1., 0.])},
+                    size=6,
+                    alternate=True)
+            g3 = Mock(
+                    axes=["w"],
+                    positions={"w":np.linspace(-1, 5, 13)},
+                    bounds={"w":np.linspace(-1.25, 5.25, 14)},
+                    size=13,
+                    alternate=True)
+            return [g1, g2, g3]
+
+        def dense(excluder):
+            return Mock(axes=excluder.axes,
+                        create_mask=Mock(side_effect=excluder.create_mask))
+
+        e1 = ROIExcluder([CircularROI([2, 2], 2.5)], ["w", "x"])
+        e2 = ROIExcluder([EllipticalROI([2, 2], [3, 2])], ["x", "y"])
+        e3 = ROIExcluder([RectangularROI([0, 0], 3, 4)], ["w", "y"])
+        e4 = ROIExcluder([CircularROI([1, 1], 2), CircularROI([3, 3], 2)],
+                         ["y", "w"])
+        d = Dimension(make_generators(), [dense(e) for e in [e1, e2, e3, e4]])
+        d.prepare()
+        with patch.object(CircularROI, "mask_points",
+                          side_effect=CircularROI.mask_points,
+                          autospec=True) as mask_points:
+            intervals = Dimension(make_generators(), [e1, e2, e3, e4])
+            intervals.prepare()
+        # no ROI is evaluated over the full product
+        for call in mask_points.call_args_list:
+            self.assertLess(len(call[0][1][0]), 5 * 6 * 13)
+
+        self.assertEqual(d.indices.tolist(), intervals.indices.tolist())
+        self.assertEqual(d.mask.tolist(), intervals.mask.tolist())
+        for axis in ["x", "y", "w"]:
+            self.assertEqual(
+                d.positions[axis].tolist(), intervals.positions[axis].tolist())
+            self.assertEqual(
+                d.lower_bounds[axis].tolist(),
+                intervals.lower_bounds[axis].tolist())
+            self.assertEqual(
+                d.upper_bounds[axis].tolist(),
+                intervals.upper_bounds[axis].tolist())
+
+    def test_prepare_single_generator_excluder_matches_prepare(self):
+        def make_generators():
+            g1 = Mock(
+                    axes=["z"],
+                    positions={"z":np.array([0., 1., 2.])},
+                    size=3,
+                    alternate=False)
+            g2 = Mock(
+                    axes=["x", "y"],
+                    positions={"x":np.array([0., 1., 2., 3., 1., 0.]),
+                               "y":np.array([0., 0., 1., 2., 3., 2.])},
+                    bounds={"x":np.array([-0.5, 0.5, 1.5, 2.5, 2., 0.5, -0.5]),
+                            "y":np.array([0., 0., 0.5, 1.5, 2.5, 2.5, 1.5])},
+                    size=6,
+                    alternate=True)
+            return [g1, g2]
+
+        e1 = ROIExcluder([CircularROI([1, 1], 1.5)], ["x", "y"])
+        e2 = ROIExcluder([CircularROI([1, 1], 1.2)], ["z", "y"])
+        dense = [Mock(axes=e.axes, create_mask=Mock(side_effect=e.create_mask))
+                 for e in [e1, e2]]
+        d = Dimension(make_generators(), dense)
+        d.prepare()
+        separable = Dimension(make_generators(), [e1, e2])
+        with patch.object(ROIExcluder, "create_mask", autospec=True,
+                          side_effect=ROIExcluder.create_mask) as create_mask:
+            separable.prepare()
+        # the x, y circle is only evaluated at the points of its generator
+        args = create_mask.call_args_list[0][0]
+        self.assertIs(e1, args[0])
+        self.assertEqual(6, len(args[1]))
+
+        self.assertEqual(d.indices.tolist(), separable.indices.tolist())
+        self.assertEqual(d.mask.tolist(), separable.mask.tolist())
+        for axis in ["x", "y", "z"]:
+            self.assertEqual(
+                d.positions[axis].tolist(), separable.positions[axis].tolist())
+            self.assertEqual(
+                d.lower_bounds[axis].tolist(),
+                separable.lower_bounds[axis].tolist())
+            self.assertEqual(
+                d.upper_bounds[axis].tolist(),
+                separable.upper_bounds[axis].tolist())
+
+    def test_prepare_separable_excludes_all(self):
+        g = Mock(
+                axes=["x"],
+                positions={"x":np.array([0., 1., 2.])},
+                bounds={"x":np.array([-0.5, 0.5, 1.5, 2.5])},
+                size=3,
+                alternate=False)
+        e1 = ROIExcluder([RectangularROI([5, 5], 1, 1)], ["x", "x"])
+        e2 = ROIExcluder([CircularROI([0, 0], 1)], ["x", "x"])
+        d = Dimension([g], [e1, e2])
+        d.prepare()
+        self.assertEqual(0, d.size)
+        self.assertEqual([0, 0, 0], d.mask.tolist())
+
+    def test_prepare_compress_matches_prepare(self):
+        def make_generators():
+            g1 = Mock(
+                    axes=["x"],
+                    positions={"x":np.array([0., 1., 2.])},
+                    size=3,
+                    alternate=False)
+            g2 = Mock(
+                    axes=["y"],
+                    positions={"y":np.array([10., 11., 12., 13.])},
+                    bounds={"y":np.array([9.5, 10.5, 11.5, 12.5, 13.5])},
+                    size=4,
+                    alternate=True)
+            return [g1, g2]
+
+        mask = np.array([1, 0, 1, 1, 1, 1, 0, 1, 0, 1, 1, 1], dtype=np.int8)
+        e = Mock(axes=["x", "y"], create_mask=Mock(return_value=mask))
+        d = Dimension(make_generators(), [e])
+        d.prepare()
+        compressed = Dimension(make_generators(), [e])
+        compressed.prepare(compress=True)
+
+        self.assertIsInstance(compressed.indices, IntervalIndex)
+        self.assertEqual(4, compressed.indices.runs)
+        self.assertEqual(d.indices.tolist(), compressed.indices.tolist())
+        self.assertEqual(mask.tolist(), compressed.mask.tolist())
+        for axis in ["x", "y"]:
+            self.assertEqual(
+                d.positions[axis].tolist(), compressed.positions[axis].tolist())
+            self.assertEqual(
+                d.lower_bounds[axis].tolist(),
+                compressed.lower_bounds[axis].tolist())
+            self.assertEqual(
+                d.upper_bounds[axis][1:5].tolist(),
+                compressed.upper_bounds[axis][1:5].tolist())
+            self.assertEqual(
+                d.positions[axis][::-2].tolist(),
+                compressed.positions[axis][::-2].tolist())
+            for idx in range(d.size):
+                self.assertEqual(
+                    d.positions[axis][idx], compressed.positions[axis][idx])
+        self.assertEqual(
+            d.get_mesh_map("y").tolist(), compressed.get_mesh_map("y").tolist())
+
+    def test_prepare_compress_unmasked_is_lazy(self):
+        g = Mock(
+                axes=["x"],
+                positions={"x":np.array([0., 1., 2.])},
+                bounds={"x":np.array([-0.5, 0.5, 1.5, 2.5])},
+                size=3,
+                alternate=False)
+        d = Dimension([g])
+        d.prepare(compress=True)
+        self.assertIsNone(d.indices)
+        self.assertEqual([0., 1., 2.], d.positions["x"].tolist())
+
+
+class IntervalIndexTests(ScanPointGeneratorTest):
+
+    def setUp(self):
+        self.indices = np.array([2, 3, 4, 7, 9, 10, 11, 12, 20])
+        self.index = IntervalIndex.from_indices(self.indices)
+
+    def test_from_indices(self):
+        self.assertEqual([2, 7, 9, 20], self.index.starts.tolist())
+        self.assertEqual([0, 3, 4, 8, 9], self.index.offsets.tolist())
+        self.assertEqual(4, self.index.runs)
+        self.assertEqual(9, len(self.index))
+        self.assertEqual(self.indices.tolist(), self.index.tolist())
+
+    def test_from_indices_empty(self):
+        index = IntervalIndex.from_indices(np.array([], dtype=np.uint32))
+        self.assertEqual(0, len(index))
+        self.assertEqual(0, index.runs)
+        self.assertEqual([], index.tolist())
+        self.assertEqual(np.uint32, index[:].dtype)
+
+    def test_getitem(self):
+        for idx in range(-9, 9):
+            self.assertEqual(self.indices[idx], self.index[idx])
+        for idx in [slice(1, 6), slice(4, 5), slice(2, 2), slice(8, 0, -3),
+                    slice(None, None, -1)]:
+            self.assertEqual(
+                self.indices[idx].tolist(), self.index[idx].tolist())
+        idx = np.array([8, 0, -1, 5, 3])
+        self.assertEqual(self.indices[idx].tolist(), self.index[idx].tolist())
+
+    def test_getitem_out_of_range_raises(self):
+        with self.assertRaises(IndexError):
+            self.index[9]
+        with self.assertRaises(IndexError):
+            self.index[-10]
+
+    def test_contiguous(self):
+        self.assertEqual(9, self.index.contiguous(4, 8))
+        self.assertEqual(4, self.index.contiguous(2, 3))
+        self.assertIsNone(self.index.contiguous(2, 4))
+        self.assertIsNone(self.index.contiguous(3, 3))
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -6,11 +6,13 @@ import unittest
 from test_util import ScanPointGeneratorTest
 from scanpointgenerator import CompoundGenerator
 from scanpointgenerator import LineGenerator
-from scanpointgenerator import CircularROI, ROIExcluder
-from scanpointgenerator import RandomOffsetMutator
-from scanpointgenerator import Points
+from scanpointgenerator import CircularROI, ROIExcluder, SquashingExcluder
+from scanpointgenerator import RandomOffsetMutator, Mutator
+from scanpointgenerator import Point, Points, PointsBuilder
 from scanpointgenerator.compat import np
 
+from mock import patch
+
 
 class GetPointsTest(ScanPointGeneratorTest):
 
@@ -105,6 +107,84 @@ class GetPointsTest(ScanPointGeneratorTest):
                 self.assertEqual(apoints.positions[axis][i], cpoints.positions[axis][i])
         self.assertTrue(np.all(apoints.indexes == cpoints.indexes))
 
+    def test_points_builder(self):
+        builder = PointsBuilder(capacity=2)
+        builder.append(self.comp.get_points(0, 5))
+        builder.append(self.comp.get_points(5, 5))
+        builder.append(self.comp.get_point(5))
+        builder.append(self.comp.get_points(6, 13))
+        self.assertEqual(13, len(builder))
+        apoints = builder.build()
+        cpoints = self.comp.get_points(0, 13)
+        self.assertEqual(0, len(builder))
+        self.assertEqual(13, len(apoints))
+        for axis in cpoints.positions:
+            self.assertEqual(cpoints.positions[axis].tolist(), apoints.positions[axis].tolist())
+            self.assertEqual(cpoints.lower[axis].tolist(), apoints.lower[axis].tolist())
+            self.assertEqual(cpoints.upper[axis].tolist(), apoints.upper[axis].tolist())
+        self.assertEqual(cpoints.indexes.tolist(), apoints.indexes.tolist())
+        self.assertEqual(cpoints.duration.tolist(), apoints.duration.tolist())
+        self.assertEqual(cpoints.delay_after.tolist(), apoints.delay_after.tolist())
+
+    def test_points_builder_from_point(self):
+        builder = PointsBuilder(capacity=1)
+        for n in range(10):
+            builder.append(self.comp.get_point(n))
+        apoints = builder.build()
+        cpoints = self.comp.get_points(0, 10)
+        self.assertEqual(cpoints.positions["x"].tolist(), apoints.positions["x"].tolist())
+        self.assertEqual(cpoints.indexes.tolist(), apoints.indexes.tolist())
+        self.assertEqual(0, len(PointsBuilder().build()))
+
+    def test_points_builder_axes_must_match(self):
+        builder = PointsBuilder()
+        builder.append(self.comp.get_points(0, 5))
+        other = self.comp.get_point(5)
+        del other.positions["z"]
+        with self.assertRaises(ValueError):
+            builder.append(other)
+        self.assertEqual(5, len(builder))
+
+    def test_add_points_grows_in_place(self):
+        apoints = self.comp.get_points(0, 2)
+        apoints += self.comp.get_point(2)
+        builder = apoints._builder
+        x = apoints.positions["x"]
+        for n in range(3, 6):
+            apoints += self.comp.get_point(n)
+        # the arrays of the first addition had room for the later points
+        self.assertIs(builder, apoints._builder)
+        self.assertTrue(np.shares_memory(x, apoints.positions["x"]))
+        for n in range(6, 10):
+            apoints += self.comp.get_point(n)
+        self.assertIs(builder, apoints._builder)
+        cpoints = self.comp.get_points(0, 10)
+        self.assertEqual(cpoints.positions["z"].tolist(), apoints.positions["z"].tolist())
+        self.assertEqual(cpoints.indexes.tolist(), apoints.indexes.tolist())
+
+    def test_add_points_after_replacing_array(self):
+        apoints = self.comp.get_points(0, 2)
+        apoints += self.comp.get_points(2, 4)
+        apoints.positions["x"] = apoints.positions["x"] + 100
+        apoints += self.comp.get_point(4)
+        expected = (self.comp.get_points(0, 4).positions["x"] + 100).tolist()
+        expected.append(self.comp.get_point(4).positions["x"])
+        self.assertEqual(expected, apoints.positions["x"].tolist())
+
+    def test_add_point_single_dimension(self):
+        comp = CompoundGenerator([LineGenerator("x", "mm", 0, 5, 6)], [], [])
+        comp.prepare()
+        apoints = comp.get_points(0, 3)
+        apoints += comp.get_point(3)
+        self.assertEqual([0, 1, 2, 3], apoints.indexes.tolist())
+
+    def test_copy_points(self):
+        points = self.comp.get_points(0, 5)
+        copied = points.__copy__()
+        self.assertEqual(points.positions["x"].tolist(), copied.positions["x"].tolist())
+        copied.positions["x"][0] = 100
+        self.assertNotEqual(100, points.positions["x"][0])
+
     def test_roi(self):
         l1 = LineGenerator("x", "mm", 0.5, 5.5, 6)
         l2 = LineGenerator("y", "mm", 0.5, 5.5, 6)
@@ -226,6 +306,317 @@ class GetPointsTest(ScanPointGeneratorTest):
                 self.assertAlmostEqual(a[0], k[0])
                 self.assertAlmostEqual(a[1], k[1])
 
+    def test_iter_chunks(self):
+        l1 = LineGenerator("x", "mm", 0.5, 5.5, 6)
+        l2 = LineGenerator("y", "mm", 0.5, 5.5, 7, True)
+        m1 = RandomOffsetMutator(12, ["x", "y"], [0.1, 0.1])
+        comp = CompoundGenerator([l1, l2], [], [m1], 5, True, 7)
+        comp.prepare()
+        chunks = list(comp.iter_chunks(4))
+        self.assertEqual([4] * 10 + [2], [len(c) for c in chunks])
+        n = 0
+        for chunk in chunks:
+            for i in range(len(chunk)):
+                point = comp.get_point(n)
+                self.assertEqual(point.indexes, chunk.indexes[i].tolist())
+                for axis in ["x", "y"]:
+                    self.assertEqual(point.positions[axis], chunk.positions[axis][i])
+                    self.assertEqual(point.lower[axis], chunk.lower[axis][i])
+                    self.assertEqual(point.upper[axis], chunk.upper[axis][i])
+                n += 1
+        self.assertEqual(comp.size, n)
+
+    def test_iter_chunks_single_point_tail_on_reversed_run(self):
+        l1 = LineGenerator("x", "mm", 0, 1, 2)
+        l2 = LineGenerator("y", "mm", 0, 1, 3, True)
+        for generators in [[LineGenerator("y", "mm", 0, 1, 6, True)],
+                           [l1, l2]]:
+            comp = CompoundGenerator(generators, [], [], continuous=True)
+            comp.prepare()
+            for chunk_size in [1, 4, 5]:
+                n = 0
+                for chunk in comp.iter_chunks(chunk_size):
+                    for i in range(len(chunk)):
+                        point = comp.get_point(n)
+                        self.assertEqual(
+                            point.indexes, np.ravel(chunk.indexes[i]).tolist())
+                        for axis in comp.axes:
+                            self.assertEqual(
+                                point.positions[axis], chunk.positions[axis][i])
+                            self.assertEqual(
+                                point.lower[axis], chunk.lower[axis][i])
+                            self.assertEqual(
+                                point.upper[axis], chunk.upper[axis][i])
+                        n += 1
+                self.assertEqual(comp.size, n)
+
+    def test_lazy_prepare(self):
+        l1 = LineGenerator("x", "mm", 0, 5, 4)
+        l2 = LineGenerator("y", "mm", 0, 5, 5, True)
+        l3 = LineGenerator("z", "mm", 0, 5, 3, True)
+        e = SquashingExcluder(["y", "z"])
+        comp = CompoundGenerator([l1, l2, l3], [e], [], 5)
+        comp.prepare(lazy=True)
+        expected = CompoundGenerator([l1, l2, l3], [e], [], 5)
+        expected.prepare()
+        self.assertEqual(expected.shape, comp.shape)
+        points = comp.get_points(0, comp.size)
+        expected_points = expected.get_points(0, expected.size)
+        self.assertEqual(expected_points.indexes.tolist(), points.indexes.tolist())
+        for axis in ["x", "y", "z"]:
+            self.assertEqual(expected_points.positions[axis].tolist(), points.positions[axis].tolist())
+            self.assertEqual(expected_points.lower[axis].tolist(), points.lower[axis].tolist())
+            self.assertEqual(expected_points.upper[axis].tolist(), points.upper[axis].tolist())
+        for n in range(comp.size):
+            self.assertEqual(expected.get_point(n).upper, comp.get_point(n).upper)
+
+    def test_get_points_array(self):
+        array = self.comp.get_points_array(7, 12)
+        points = self.comp.get_points(7, 12)
+        self.assertEqual(5, len(array))
+        self.assertEqual(("x", "y", "z"), array["positions"].dtype.names)
+        self.assertTrue(array.flags.c_contiguous)
+        for axis in ["x", "y", "z"]:
+            self.assertEqual(points.positions[axis].tolist(), array["positions"][axis].tolist())
+            self.assertEqual(points.lower[axis].tolist(), array["lower"][axis].tolist())
+            self.assertEqual(points.upper[axis].tolist(), array["upper"][axis].tolist())
+        self.assertEqual(points.indexes.tolist(), array["indexes"].tolist())
+        self.assertEqual([5.] * 5, array["duration"].tolist())
+        self.assertEqual([7.] * 5, array["delay_after"].tolist())
+
+    def test_get_points_array_empty(self):
+        array = self.comp.get_points_array(7, 12)
+        empty = self.comp.get_points_array(2, 2)
+        self.assertEqual(0, len(empty))
+        self.assertEqual(array.dtype, empty.dtype)
+
+        comp = CompoundGenerator([LineGenerator("x", "mm", 0, 1, 3)], [], [])
+        comp.prepare()
+        empty = comp.get_points_array(2, 2)
+        self.assertEqual(comp.get_points_array(0, 1).dtype, empty.dtype)
+
+    def test_to_structured_single_dimension(self):
+        comp = CompoundGenerator([LineGenerator("x", "mm", 0, 1, 3)], [], [])
+        comp.prepare()
+        array = comp.get_points(0, 3).to_structured()
+        self.assertEqual([[0], [1], [2]], array["indexes"].tolist())
+        self.assertEqual([0., 0.5, 1.], array["positions"]["x"].tolist())
+        empty = Points().to_structured()
+        self.assertEqual(0, len(empty))
+        self.assertEqual((), empty["positions"].dtype.names or ())
+
+    def test_get_point_reuses_point(self):
+        point = Point()
+        for n in [0, 5, 17]:
+            expected = self.comp.get_point(n)
+            self.assertIs(point, self.comp.get_point(n, point))
+            self.assertEqual(expected.positions, point.positions)
+            self.assertEqual(expected.lower, point.lower)
+            self.assertEqual(expected.upper, point.upper)
+            self.assertEqual(expected.indexes, point.indexes)
+            self.assertEqual(expected.duration, point.duration)
+            self.assertEqual(expected.delay_after, point.delay_after)
+
+    def test_iterator_reuse(self):
+        points = [(p.positions.copy(), list(p.indexes))
+                  for p in self.comp.iterator()]
+        reused = []
+        for p in self.comp.iterator(reuse=True):
+            reused.append((p.positions.copy(), list(p.indexes)))
+            last = p
+        self.assertEqual(points, reused)
+        self.assertIs(last, self.comp.get_point(0, last))
+
+    def test_points_are_slotted(self):
+        for point in [Point(), Points()]:
+            self.assertFalse(hasattr(point, "__dict__"))
+            with self.assertRaises(AttributeError):
+                point.position = {}
+
+    def assertPointsMatchPoint(self, comp, points, indices):
+        self.assertEqual(len(indices), len(points))
+        for i, n in enumerate(indices):
+            point = comp.get_point(n)
+            self.assertEqual(point.indexes, np.asarray(points.indexes[i]).tolist())
+            for axis in point.positions:
+                self.assertEqual(point.positions[axis], points.positions[axis][i])
+                self.assertEqual(point.lower[axis], points.lower[axis][i])
+                self.assertEqual(point.upper[axis], points.upper[axis][i])
+            self.assertEqual(point.duration, points.duration[i])
+            self.assertEqual(point.delay_after, points.delay_after[i])
+
+    def test_get_points_at(self):
+        l1 = LineGenerator("x", "mm", 0, 5, 4, True)
+        l2 = LineGenerator("y", "mm", 0, 5, 7, True)
+        m1 = RandomOffsetMutator(12, ["x", "y"], [0.1, 0.1])
+        comp = CompoundGenerator([l1, l2], [], [m1], 5, True, 7)
+        comp.prepare()
+        indices = [27, 0, 6, 7, 8, 13, 14, 26, 6, -1]
+        points = comp.get_points_at(indices)
+        self.assertPointsMatchPoint(comp, points, [n % 28 for n in indices])
+        self.assertPointsMatchPoint(comp, comp.get_points_at([20]), [20])
+        self.assertEqual(0, len(comp.get_points_at([])))
+
+    def test_get_points_at_repeated_index_on_reversed_run(self):
+        l1 = LineGenerator("x", "mm", 0, 1, 2)
+        l2 = LineGenerator("y", "mm", 0, 1, 3, True)
+        comp = CompoundGenerator([l1, l2], [], [], continuous=True)
+        comp.prepare()
+        for indices in [[4], [4, 4], [5, 5], [3, 3, 3]]:
+            self.assertPointsMatchPoint(
+                comp, comp.get_points_at(indices), indices)
+
+    def test_get_points_at_raises(self):
+        with self.assertRaises(IndexError):
+            self.comp.get_points_at([0, 125])
+        with self.assertRaises(IndexError):
+            self.comp.get_points_at([-126])
+
+    def test_get_points_step(self):
+        self.assertPointsMatchPoint(
+            self.comp, self.comp.get_points(3, 120, 10), range(3, 120, 10))
+        self.assertPointsMatchPoint(
+            self.comp, self.comp.get_points(120, 3, -7), range(120, 3, -7))
+        self.assertEqual(0, len(self.comp.get_points(10, 3, 2)))
+        with self.assertRaises(ValueError):
+            self.comp.get_points(0, 10, 0)
+
+    def test_get_points_views(self):
+        l1 = LineGenerator("x", "mm", 0, 5, 4, True)
+        l2 = LineGenerator("y", "mm", 0, 5, 7, True)
+        comp = CompoundGenerator([l1, l2], [], [], 5, True, 7)
+        comp.prepare()
+        y = comp.dimensions[-1]
+        for start, finish in [(0, 7), (1, 5), (7, 14), (9, 13), (21, 28)]:
+            points = comp.get_points(start, finish, views=True, broadcast=True)
+            self.assertPointsMatchPoint(comp, points, range(start, finish))
+            for array in [points.positions["y"], points.lower["y"], points.upper["y"]]:
+                self.assertFalse(array.flags.writeable)
+                self.assertTrue(np.shares_memory(array, y.positions["y"]) or
+                                np.shares_memory(array, y.lower_bounds["y"]) or
+                                np.shares_memory(array, y.upper_bounds["y"]))
+            self.assertTrue(Points.is_broadcast(points.positions["x"]))
+        # Ranges spanning more than one run are copied
+        points = comp.get_points(5, 10, views=True)
+        self.assertPointsMatchPoint(comp, points, range(5, 10))
+        self.assertTrue(points.positions["y"].flags.writeable)
+        # as are all ranges unless views are requested
+        for array in comp.get_points(0, 7).positions.values():
+            self.assertFalse(np.shares_memory(array, y.positions["y"]))
+
+    def test_get_points_writeable_by_default(self):
+        l1 = LineGenerator("x", "mm", 0, 5, 4, True)
+        l2 = LineGenerator("y", "mm", 0, 5, 7, True)
+        comp = CompoundGenerator([l1, l2], [], [], 5, True, 7)
+        comp.prepare()
+        y = comp.dimensions[-1]
+        expected = y.positions["y"][1:5].copy()
+        points = comp.get_points(1, 5)
+        points.positions["y"] += 1
+        points.lower["y"][0] = 100
+        self.assertEqual((expected + 1).tolist(), points.positions["y"].tolist())
+        self.assertEqual(expected.tolist(), y.positions["y"][1:5].tolist())
+        self.assertEqual(comp.get_point(1).lower["y"], y.lower_bounds["y"][1])
+
+    def test_get_points_broadcast_columns(self):
+        points = self.comp.get_points(7, 12, broadcast=True)
+        for column in [points.positions["x"], points.lower["x"], points.upper["x"]]:
+            self.assertTrue(Points.is_broadcast(column))
+        self.assertEqual([0.] * 5, points.positions["x"].tolist())
+        self.assertFalse(Points.is_broadcast(points.positions["y"]))
+        self.assertFalse(Points.is_broadcast(points.positions["z"]))
+        self.assertPointsMatchPoint(self.comp, points, range(7, 12))
+        self.assertEqual([[0, 1, 2], [0, 1, 3], [0, 1, 4], [0, 2, 0], [0, 2, 1]],
+                         points.indexes.tolist())
+        # expanded by copying, adding or slicing into other Points
+        self.assertTrue(points.__copy__().positions["x"].flags.writeable)
+        points += self.comp.get_point(12)
+        self.assertEqual([0.] * 6, points.positions["x"].tolist())
+        points = self.comp.get_points_at([7, 8, 9], broadcast=True)
+        self.assertTrue(Points.is_broadcast(points.positions["x"]))
+        self.assertPointsMatchPoint(self.comp, points, [7, 8, 9])
+
+    def test_get_points_columns_expanded_by_default(self):
+        for points in [self.comp.get_points(7, 12),
+                       self.comp.get_points_at([7, 8, 9, 10, 11]),
+                       next(self.comp.iter_chunks(5))]:
+            for column in [points.positions["x"], points.lower["x"],
+                           points.upper["x"], points.indexes[:, 0]]:
+                self.assertFalse(Points.is_broadcast(column))
+                self.assertTrue(column.flags.writeable)
+        points = self.comp.get_points(7, 12)
+        points.positions["x"] += np.arange(5)
+        points.lower["x"] -= 1
+        self.assertEqual([0., 1., 2., 3., 4.], points.positions["x"].tolist())
+        self.assertEqual([-1.] * 5, points.lower["x"].tolist())
+
+    def test_get_points_mutated_columns_are_writeable(self):
+        m1 = RandomOffsetMutator(12, ["x", "z"], [0.1, 0.1])
+        comp = CompoundGenerator(self.comp.generators, [], [m1], 5, True, 7)
+        comp.prepare()
+        points = comp.get_points(5, 10, broadcast=True)
+        for axis in ["x", "z"]:
+            for array in [points.positions[axis], points.lower[axis], points.upper[axis]]:
+                self.assertFalse(Points.is_broadcast(array))
+                self.assertTrue(array.flags.writeable)
+        # Not mutated
+        self.assertTrue(Points.is_broadcast(points.positions["y"]))
+        self.assertPointsMatchPoint(comp, points, range(5, 10))
+
+    def test_get_points_mutate_in_place(self):
+        class ScaleMutator(Mutator):
+            def mutate(self, point, index):
+                point.positions["z"] = point.positions["z"] * 2
+                return point
+
+            def mutated_axes(self):
+                return dict(positions=["z"])
+
+            def mutate_in_place(self, points, indices):
+                points.positions["z"] *= 2
+
+        scale = ScaleMutator()
+        comp = CompoundGenerator(self.comp.generators, [], [scale], 5, True, 7)
+        comp.prepare()
+        with patch.object(scale, "mutate", wraps=scale.mutate) as mutate:
+            points = comp.get_points(5, 10, views=True)
+            mutate.assert_not_called()
+        self.assertEqual([0., 2.5, 5., 7.5, 10.], points.positions["z"].tolist())
+        self.assertEqual([-0.625, 0.625, 1.875, 3.125, 4.375], points.lower["z"].tolist())
+        self.assertFalse(points.lower["z"].flags.writeable)
+        self.assertPointsMatchPoint(comp, points, range(5, 10))
+
+    def test_get_points_mutate_without_in_place(self):
+        class ScaleMutator(Mutator):
+            def mutate(self, point, index):
+                point.positions["z"] = point.positions["z"] * 2
+                return point
+
+        comp = CompoundGenerator(self.comp.generators, [], [ScaleMutator()], 5, True, 7)
+        comp.prepare()
+        points = comp.get_points(5, 10)
+        self.assertEqual([0., 2.5, 5., 7.5, 10.], points.positions["z"].tolist())
+        self.assertTrue(points.lower["z"].flags.writeable)
+        self.assertFalse(Points.is_broadcast(points.positions["x"]))
+        self.assertPointsMatchPoint(comp, points, range(5, 10))
+
+    def test_get_points_lazy_views(self):
+        l1 = LineGenerator("x", "mm", 0, 5, 4, True)
+        l2 = LineGenerator("y", "mm", 0, 5, 7, True)
+        comp = CompoundGenerator([l1, l2], [], [], 5, True, 7)
+        comp.prepare(lazy=True)
+        for start, finish in [(0, 7), (1, 5), (7, 14), (8, 14), (21, 28)]:
+            self.assertPointsMatchPoint(
+                comp, comp.get_points(start, finish, views=True),
+                range(start, finish))
+
+    def test_iter_chunks_raises(self):
+        with self.assertRaises(ValueError):
+            next(self.comp.iter_chunks(0))
+        comp = CompoundGenerator([LineGenerator("x", "mm", 0, 1, 2)], [], [])
+        with self.assertRaises(ValueError):
+            next(comp.iter_chunks(10))
+
     def test_negative_consistency_and_above_m(self):
         ''' Also tests "above m" functions as length 1 no dimension moves '''
         for a in [-1, -2, -7, -9]:
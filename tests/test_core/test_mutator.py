@@ -17,6 +17,12 @@ class MutatorTest(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             m.mutate(MagicMock(), MagicMock())
 
+    def test_mutate_in_place_raises(self):
+        m = Mutator()
+        self.assertIsNone(m.mutated_axes())
+        with self.assertRaises(NotImplementedError):
+            m.mutate_in_place(MagicMock(), MagicMock())
+
 
 class SerialisationTest(unittest.TestCase):
 
@@ -0,0 +1,93 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import unittest
+
+from mock import patch
+
+from test_util import ScanPointGeneratorTest
+from scanpointgenerator.core import PackedMask
+from scanpointgenerator.compat import np
+
+
+class PackedMaskTest(ScanPointGeneratorTest):
+
+    def setUp(self):
+        self.values = [1, 0, 0, 1, 1, 0, 1, 0, 0, 1, 1]
+        self.mask = PackedMask.from_mask(np.array(self.values, dtype=np.int8))
+
+    def test_from_mask(self):
+        self.assertEqual(11, len(self.mask))
+        self.assertEqual([0b10011010, 0b01100000], self.mask.bits.tolist())
+        self.assertEqual(self.values, self.mask.tolist())
+
+    def test_from_indices(self):
+        mask = PackedMask.from_indices(np.array([0, 3, 4, 6, 9, 10]), 11)
+        self.assertEqual(self.mask.bits.tolist(), mask.bits.tolist())
+        self.assertEqual(11, len(mask))
+
+    @patch("scanpointgenerator.core.packedmask.PACKED_BLOCK_SIZE", 1)
+    def test_from_indices_blocks(self):
+        mask = PackedMask.from_indices(np.array([0, 3, 4, 6, 9, 10]), 11)
+        self.assertEqual(self.mask.bits.tolist(), mask.bits.tolist())
+
+    def test_ones(self):
+        mask = PackedMask.ones(11)
+        self.assertEqual([0xFF, 0b11100000], mask.bits.tolist())
+        self.assertEqual([1] * 11, mask.tolist())
+        self.assertEqual([0xFF], PackedMask.ones(8).bits.tolist())
+
+    def test_and_or(self):
+        other = np.array([1, 1, 0, 0, 1, 1, 0, 0, 1, 1, 0])
+        expected_and = [a & b for a, b in zip(self.values, other)]
+        expected_or = [a | b for a, b in zip(self.values, other)]
+        self.assertEqual(expected_and, (self.mask & other).tolist())
+        self.assertEqual(
+            expected_or, (self.mask | PackedMask.from_mask(other)).tolist())
+        self.assertEqual(self.values, self.mask.tolist())
+
+    def test_in_place(self):
+        other = PackedMask.from_mask(np.array([0] * 11))
+        self.mask |= PackedMask.ones(11)
+        self.assertEqual([1] * 11, self.mask.tolist())
+        self.mask &= other
+        self.assertEqual([0] * 11, self.mask.tolist())
+
+    def test_lengths_differ_raises(self):
+        with self.assertRaises(ValueError):
+            self.mask & PackedMask.ones(12)
+
+    @patch("scanpointgenerator.core.packedmask.PACKED_BLOCK_SIZE", 1)
+    def test_count_and_nonzero(self):
+        self.assertEqual(6, self.mask.count())
+        self.assertEqual(
+            [0, 3, 4, 6, 9, 10], self.mask.nonzero()[0].tolist())
+        empty = PackedMask.from_mask(np.zeros(20))
+        self.assertEqual(0, empty.count())
+        self.assertEqual([], empty.nonzero()[0].tolist())
+
+    def test_getitem(self):
+        self.assertEqual(1, self.mask[3])
+        self.assertEqual(0, self.mask[7])
+        self.assertEqual(1, self.mask[-1])
+        self.assertEqual([1, 1, 0], self.mask[3:6].tolist())
+        with self.assertRaises(IndexError):
+            self.mask[11]
+
+    def test_array(self):
+        self.assertEqual(self.values, np.asarray(self.mask).tolist())
+        self.assertEqual(np.int8, np.asarray(self.mask).dtype)
+
+    def test_concatenate(self):
+        first = PackedMask.from_mask(np.array([1, 0, 0, 0, 0, 0, 0, 1]))
+        mask = PackedMask.concatenate([first, self.mask])
+        self.assertEqual(19, len(mask))
+        self.assertEqual([1, 0, 0, 0, 0, 0, 0, 1] + self.values, mask.tolist())
+
+    def test_concatenate_partial_byte_raises(self):
+        with self.assertRaises(ValueError):
+            PackedMask.concatenate([self.mask, self.mask])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,109 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import unittest
+
+from test_util import ScanPointGeneratorTest
+from scanpointgenerator import CompoundGenerator, LineGenerator, ROIExcluder
+from scanpointgenerator.rois import CircularROI, PolygonalROI
+from scanpointgenerator.core.parallelmask import create_mask_parallel, \
+    MaskPool
+from scanpointgenerator.compat import range_, np
+
+from pkg_resources import require
+require("mock")
+from mock import Mock, patch
+
+
+class CreateMaskParallelTest(ScanPointGeneratorTest):
+
+    def setUp(self):
+        self.x = np.repeat(np.linspace(-2, 2, 101), 99)
+        self.y = np.tile(np.linspace(-2, 2, 99), 101)
+        self.excluder = ROIExcluder(
+            [CircularROI([0.5, 0], 1),
+             PolygonalROI([-2, -1, -1.5], [-2, -2, 1])],
+            ["x", "y"])
+
+    def test_matches_create_mask(self):
+        expected = self.excluder.create_mask(self.x, self.y)
+        mask = create_mask_parallel(self.excluder, [self.x, self.y], 3, 1000)
+        self.assertEqual(np.int8, mask.dtype)
+        self.assertEqual(expected.tolist(), mask.tolist())
+
+    def test_single_worker_uses_create_mask(self):
+        mask = create_mask_parallel(self.excluder, [self.x, self.y], 1, 1000)
+        self.assertEqual(
+            self.excluder.create_mask(self.x, self.y).tolist(), mask.tolist())
+
+    def test_lengths_must_match(self):
+        with self.assertRaises(ValueError):
+            create_mask_parallel(self.excluder, [self.x, self.y[1:]], 2, 10)
+
+    def test_pool_creates_masks(self):
+        other = ROIExcluder([CircularROI([0, 0], 1)], ["y", "x"])
+        with MaskPool([self.excluder, other], 3, 1000) as pool:
+            for excluder in [self.excluder, other, self.excluder]:
+                mask = pool.create_mask(excluder, [self.x, self.y])
+                self.assertEqual(np.int8, mask.dtype)
+                self.assertEqual(
+                    excluder.create_mask(self.x, self.y).tolist(),
+                    mask.tolist())
+
+    def test_pool_splits_short_arrays_between_workers(self):
+        with MaskPool([self.excluder], 2, 10000) as pool:
+            with patch("scanpointgenerator.core.parallelmask._mask_block") \
+                    as mask_block:
+                pool._pool = Mock(map=Mock())
+                pool.create_mask(self.excluder, [self.x, self.y])
+        tasks = pool._pool.map.call_args[0][1]
+        self.assertEqual([(0, 5000), (5000, 9999)],
+                         [(t[2], t[3]) for t in tasks])
+
+    def make_generator(self):
+        xg = LineGenerator("x", "mm", 0, 4, 40, alternate=True)
+        yg = LineGenerator("y", "mm", 0, 4, 30)
+        # a rotated rectangle is masked point by point
+        e = ROIExcluder(
+            [PolygonalROI([2, 3.5, 2, 0.5], [0.5, 2, 3.5, 2])], ["x", "y"])
+        return CompoundGenerator([yg, xg], [e], [])
+
+    def check_prepare_mask_workers(self, **kwargs):
+        expected = self.make_generator()
+        expected.prepare()
+        g = self.make_generator()
+        create_mask = MaskPool.create_mask
+        with patch.object(MaskPool, "create_mask", autospec=True,
+                          side_effect=create_mask) as pool_create_mask, \
+                patch.object(MaskPool, "__init__", autospec=True,
+                             side_effect=MaskPool.__init__) as pool_init:
+            g.prepare(mask_workers=2, mask_block_size=100, **kwargs)
+        self.assertTrue(pool_create_mask.called)
+        self.assertEqual(1, pool_init.call_count)
+        self.assertEqual(
+            expected.dimensions[0].indices.tolist(),
+            g.dimensions[0].indices.tolist())
+        for axis in ["x", "y"]:
+            self.assertEqual(
+                expected.dimensions[0].positions[axis].tolist(),
+                g.dimensions[0].positions[axis].tolist())
+
+    def test_prepare_mask_workers(self):
+        self.check_prepare_mask_workers()
+
+    @patch("scanpointgenerator.core.dimension.STREAMING_BLOCK_SIZE", 200)
+    def test_prepare_streaming_mask_workers(self):
+        self.check_prepare_mask_workers(streaming=True)
+
+    def test_prepare_separable_does_not_start_pool(self):
+        xg = LineGenerator("x", "mm", 0, 4, 40, alternate=True)
+        yg = LineGenerator("y", "mm", 0, 4, 30)
+        e = ROIExcluder([CircularROI([2, 2], 1.5)], ["x", "y"])
+        g = CompoundGenerator([yg, xg], [e], [])
+        with patch("scanpointgenerator.core.dimension.MaskPool") as pool:
+            g.prepare(mask_workers=2)
+        pool.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -2,6 +2,7 @@ import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 import unittest
+import timeit
 
 from pkg_resources import require
 require("mock")
@@ -9,7 +10,10 @@ from mock import patch
 
 from test_util import ScanPointGeneratorTest
 from scanpointgenerator import Random
+from scanpointgenerator.compat import np
 
+# wall-clock comparisons are only meaningful on an otherwise idle machine
+BENCHMARK = bool(os.environ.get("SCANPOINTGENERATOR_BENCHMARK"))
 
 class RandomTest(unittest.TestCase):
 
@@ -60,6 +64,47 @@ class RandomTest(unittest.TestCase):
         response = self.RNG.random()
         self.assertAlmostEqual(0.436480924, response, places=10)
 
+    def test_random_array(self):
+        for seed in [1, 0, 12345, 2**40 + 3]:
+            expected = Random(seed)
+            rng = Random(seed)
+            numbers = [expected.random() for _ in range(2000)]
+            self.assertEqual(numbers[:1], rng.random_array(1).tolist())
+            self.assertEqual([], rng.random_array(0).tolist())
+            self.assertEqual(numbers[1:1500], rng.random_array(1499).tolist())
+            self.assertEqual(numbers[1500:], rng.random_array(500).tolist())
+            # Leaves the same state as calls to random
+            self.assertEqual(expected.index, rng.index)
+            self.assertEqual(expected.seeds, rng.seeds)
+            self.assertEqual(expected.random(), rng.random())
+
+    def test_random_array_continues_random(self):
+        self.RNG.seeds[0] = 1234567890
+        self.assertAlmostEqual(0.633794821, self.RNG.random_array(1)[0], places=10)
+        self.assertAlmostEqual(0.316782824, self.RNG.random(), places=10)
+        self.assertAlmostEqual(-0.789226097, self.RNG.random_array(2)[0], places=10)
+        self.assertAlmostEqual(0.948058921, self.RNG.random(), places=10)
+
+    def test_twist_array(self):
+        words = [1, 54235326, 723456923, 23489293] + [0]*620
+        self.RNG.seeds = list(words)
+        self.RNG.twist()
+        first = list(self.RNG.seeds)
+        self.RNG.twist()
+        twisted = Random._twist_array(np.array(words, dtype=np.uint32), 2)
+        self.assertEqual(words + first + self.RNG.seeds, twisted.tolist())
+
+    @unittest.skipUnless(BENCHMARK, "SCANPOINTGENERATOR_BENCHMARK not set")
+    def test_random_array_faster(self):
+        expected = Random(1)
+        rng = Random(1)
+        rng.random_array(1)
+        scalar = min(timeit.repeat(
+            lambda: [expected.random() for _ in range(10000)], number=1, repeat=3))
+        array = min(timeit.repeat(
+            lambda: rng.random_array(10000), number=1, repeat=3))
+        self.assertLess(array * 10, scalar)
+
     def test_int32(self):
         response = self.RNG._int32(0x100000001)
 
@@ -40,6 +40,56 @@ class TestCreateMask(ScanPointGeneratorTest):
         self.assertEqual(y_points.tolist(), r2_call_list[1].tolist())
         self.assertEqual(expected_mask.tolist(), mask.tolist())
 
+    @patch("scanpointgenerator.excluders.roiexcluder.PACKED_MASK_BLOCK_SIZE", 8)
+    def test_create_packed_mask_blocks(self):
+        e = ROIExcluder([CircularROI([0, 0], 1)], ["x", "y"])
+        x_points = np.linspace(-2, 2, 21)
+        y_points = np.linspace(-1, 1, 21)
+
+        mask = e.create_packed_mask(x_points, y_points)
+
+        self.assertEqual(21, len(mask))
+        self.assertEqual(
+            e.create_mask(x_points, y_points).astype(int).tolist(),
+            mask.tolist())
+
+    def test_create_axis_masks_single_roi(self):
+        e = ROIExcluder([self.r1], ["x", "y"])
+        self.r1.mask_axes.return_value = [np.array([True]), np.array([False])]
+        x_points = np.array([1, 2])
+        y_points = np.array([10, 10, 20])
+
+        masks = e.create_axis_masks(x_points, y_points)
+
+        call_list = self.r1.mask_axes.call_args_list[0][0][0]
+        self.assertEqual(x_points.tolist(), call_list[0].tolist())
+        self.assertEqual(y_points.tolist(), call_list[1].tolist())
+        self.assertEqual(self.r1.mask_axes.return_value, masks)
+
+    def test_create_axis_masks_union_is_none(self):
+        masks = self.e.create_axis_masks(np.array([1]), np.array([2]))
+        self.assertIsNone(masks)
+        self.r1.mask_axes.assert_not_called()
+
+    def test_create_intervals_single_roi(self):
+        e = ROIExcluder([self.r1], ["x", "y"])
+        self.r1.mask_intervals.return_value = (np.array([0]), np.array([2]))
+        x_points = np.array([1, 2])
+        y_points = np.array([10])
+
+        intervals = e.create_intervals(0, x_points, y_points)
+
+        call_args = self.r1.mask_intervals.call_args_list[0][0]
+        self.assertEqual(x_points.tolist(), call_args[0][0].tolist())
+        self.assertEqual(y_points.tolist(), call_args[0][1].tolist())
+        self.assertEqual(0, call_args[1])
+        self.assertEqual(self.r1.mask_intervals.return_value, intervals)
+
+    def test_create_intervals_union_is_none(self):
+        intervals = self.e.create_intervals(0, np.array([1]), np.array([2]))
+        self.assertIsNone(intervals)
+        self.r1.mask_intervals.assert_not_called()
+
 
 class TestSerialisation(unittest.TestCase):
 
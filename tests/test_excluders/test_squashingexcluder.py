@@ -22,6 +22,15 @@ class TestCreateMask(ScanPointGeneratorTest):
 
         self.assertEqual(expected_mask.tolist(), mask.tolist())
 
+    def test_create_packed_mask_returns_all_points(self):
+        x_points = np.array([1, 2, 3, 4])
+        y_points = np.array([10, 10, 20, 20])
+
+        mask = self.e.create_packed_mask(x_points, y_points)
+
+        self.assertEqual(4, len(mask))
+        self.assertEqual([1, 1, 1, 1], mask.tolist())
+
 
 class TestSerialisation(unittest.TestCase):
 
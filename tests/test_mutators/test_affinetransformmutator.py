@@ -0,0 +1,101 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import unittest
+
+from test_util import ScanPointGeneratorTest
+from scanpointgenerator.compat import np
+from scanpointgenerator.generators import LineGenerator, SpiralGenerator
+from scanpointgenerator.mutators import AffineTransformMutator
+from scanpointgenerator import Point, CompoundGenerator
+
+
+class AffineTransformMutatorTest(ScanPointGeneratorTest):
+
+    def setUp(self):
+        # 90 degree rotation about the origin then an offset
+        self.m = AffineTransformMutator(["x", "y"], [[0, -1], [1, 0]], [10, 20])
+
+    def test_init(self):
+        self.assertEqual(["x", "y"], self.m.axes)
+        self.assertEqual([0, -1, 1, 0], self.m.matrix)
+        self.assertEqual([10, 20], self.m.translation)
+        m = AffineTransformMutator("x", [2])
+        self.assertEqual([0], m.translation)
+        m = AffineTransformMutator(["x", "y"], [1, 0, 0, 1], ())
+        self.assertEqual([0, 0], m.translation)
+
+    def test_init_raises(self):
+        with self.assertRaises(ValueError):
+            AffineTransformMutator(["x", "y"], [1, 0, 0])
+        with self.assertRaises(ValueError):
+            AffineTransformMutator(["x", "y"], [1, 0, 0, 1], [1])
+
+    def test_mutate_point(self):
+        p = Point()
+        p.indexes = [0]
+        p.positions = {"x": 1., "y": 2., "z": 3.}
+        p.lower = {"x": 0.5, "y": 2., "z": 3.}
+        p.upper = {"x": 1.5, "y": 2., "z": 3.}
+        q = self.m.mutate(p, 0)
+        self.assertEqual({"x": 8., "y": 21., "z": 3.}, q.positions)
+        self.assertEqual({"x": 8., "y": 20.5, "z": 3.}, q.lower)
+        self.assertEqual({"x": 8., "y": 21.5, "z": 3.}, q.upper)
+
+    def test_mutate_points_matches_point(self):
+        theta = np.radians(30)
+        m = AffineTransformMutator(
+            ["y", "x"], [np.cos(theta), -np.sin(theta), np.sin(theta), np.cos(theta)],
+            [0.1, -0.3])
+        line = LineGenerator("z", "mm", 0, 1, 3)
+        spiral = SpiralGenerator(["x", "y"], ["mm", "mm"], [0., 0.], 2.0, 0.5, True)
+        g = CompoundGenerator([line, spiral], [], [m])
+        g.prepare()
+        for points, indices in [(g.get_points(0, g.size), range(g.size)),
+                                (g.get_points_at([5, 0, 17]), [5, 0, 17])]:
+            for i, n in enumerate(indices):
+                point = g.get_point(n)
+                for axis in ["x", "y", "z"]:
+                    self.assertEqual(point.positions[axis], points.positions[axis][i])
+                    self.assertEqual(point.lower[axis], points.lower[axis][i])
+                    self.assertEqual(point.upper[axis], points.upper[axis][i])
+
+    def test_mutate_points_transforms(self):
+        x = LineGenerator("x", "mm", 0, 2, 3)
+        y = LineGenerator("y", "mm", 0, 1, 2)
+        g = CompoundGenerator([y, x], [], [self.m])
+        g.prepare()
+        points = g.get_points(0, 6)
+        self.assertEqual([10., 10., 10., 9., 9., 9.], points.positions["x"].tolist())
+        self.assertEqual([20., 21., 22., 20., 21., 22.], points.positions["y"].tolist())
+        self.assertEqual([19.5, 20.5, 21.5, 19.5, 20.5, 21.5], points.lower["y"].tolist())
+        self.assertEqual([20.5, 21.5, 22.5, 20.5, 21.5, 22.5], points.upper["y"].tolist())
+
+
+class TestSerialisation(unittest.TestCase):
+
+    def test_to_dict(self):
+        m = AffineTransformMutator(["x", "y"], [[0, -1], [1, 0]], [10, 20])
+        expected_dict = dict()
+        expected_dict['typeid'] = "scanpointgenerator:mutator/AffineTransformMutator:1.0"
+        expected_dict['axes'] = ["x", "y"]
+        expected_dict['matrix'] = [0, -1, 1, 0]
+        expected_dict['translation'] = [10, 20]
+
+        self.assertEqual(expected_dict, m.to_dict())
+
+    def test_from_dict(self):
+        _dict = dict()
+        _dict['axes'] = ["x", "y"]
+        _dict['matrix'] = [0, -1, 1, 0]
+        _dict['translation'] = [10, 20]
+
+        m = AffineTransformMutator.from_dict(_dict)
+
+        self.assertEqual(["x", "y"], m.axes)
+        self.assertEqual([0, -1, 1, 0], m.matrix)
+        self.assertEqual([10, 20], m.translation)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
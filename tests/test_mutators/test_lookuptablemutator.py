@@ -0,0 +1,86 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+import unittest
+
+from test_util import ScanPointGeneratorTest
+from scanpointgenerator.generators import LineGenerator
+from scanpointgenerator.mutators import LookupTableMutator, RandomOffsetMutator
+from scanpointgenerator import Point, CompoundGenerator
+
+
+class LookupTableMutatorTest(ScanPointGeneratorTest):
+
+    def setUp(self):
+        self.m = LookupTableMutator("x", [0., 1., 2.], [0., 1.5, 2.])
+
+    def test_init(self):
+        self.assertEqual("x", self.m.axis)
+        self.assertEqual([0., 1., 2.], self.m.demand)
+        self.assertEqual([0., 1.5, 2.], self.m.corrected)
+
+    def test_init_raises(self):
+        with self.assertRaises(ValueError):
+            LookupTableMutator("x", [0., 1.], [0.])
+        with self.assertRaises(ValueError):
+            LookupTableMutator("x", [], [])
+        with self.assertRaises(ValueError):
+            LookupTableMutator("x", [0., 2., 1.], [0., 1., 2.])
+        with self.assertRaises(ValueError):
+            LookupTableMutator("x", [0., 1., 1.], [0., 1., 2.])
+
+    def test_mutate_point(self):
+        p = Point()
+        p.indexes = [0]
+        p.positions = {"x": 0.5, "y": 0.5}
+        p.lower = {"x": -1., "y": 0.5}
+        p.upper = {"x": 1.5, "y": 0.5}
+        q = self.m.mutate(p, 0)
+        self.assertEqual({"x": 0.75, "y": 0.5}, q.positions)
+        self.assertEqual({"x": 0., "y": 0.5}, q.lower)
+        self.assertEqual({"x": 1.75, "y": 0.5}, q.upper)
+
+    def test_mutate_points_matches_point(self):
+        x = LineGenerator("x", "mm", -0.5, 2.5, 7, True)
+        y = LineGenerator("y", "mm", 0, 2, 3)
+        offset = RandomOffsetMutator(1, ["x"], [0.1])
+        for mutators in [[self.m], [offset, self.m, LookupTableMutator("y", [0., 2.], [1., 2.])]]:
+            g = CompoundGenerator([y, x], [], mutators)
+            g.prepare()
+            points = g.get_points(0, g.size)
+            for n in range(g.size):
+                point = g.get_point(n)
+                for axis in ["x", "y"]:
+                    self.assertEqual(point.positions[axis], points.positions[axis][n])
+                    self.assertEqual(point.lower[axis], points.lower[axis][n])
+                    self.assertEqual(point.upper[axis], points.upper[axis][n])
+        self.assertEqual([1., 1.5, 2.], points.positions["y"][::7].tolist())
+
+
+class TestSerialisation(unittest.TestCase):
+
+    def test_to_dict(self):
+        m = LookupTableMutator("x", [0., 1.], [0.1, 1.2])
+        expected_dict = dict()
+        expected_dict['typeid'] = "scanpointgenerator:mutator/LookupTableMutator:1.0"
+        expected_dict['axis'] = "x"
+        expected_dict['demand'] = [0., 1.]
+        expected_dict['corrected'] = [0.1, 1.2]
+
+        self.assertEqual(expected_dict, m.to_dict())
+
+    def test_from_dict(self):
+        _dict = dict()
+        _dict['axis'] = "x"
+        _dict['demand'] = [0., 1.]
+        _dict['corrected'] = [0.1, 1.2]
+
+        m = LookupTableMutator.from_dict(_dict)
+
+        self.assertEqual("x", m.axis)
+        self.assertEqual([0., 1.], m.demand)
+        self.assertEqual([0.1, 1.2], m.corrected)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -4,7 +4,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 import unittest
 
 from test_util import ScanPointGeneratorTest
-from scanpointgenerator.compat import range_
+from scanpointgenerator.compat import range_, np
 from scanpointgenerator.generators import LineGenerator, LissajousGenerator
 from scanpointgenerator.mutators import RandomOffsetMutator
 from scanpointgenerator import Point, CompoundGenerator
@@ -120,6 +120,32 @@ class RandomOffsetMutatorTest(ScanPointGeneratorTest):
         self.assertAlmostEqual(2.25045721, q.upper["y"])
         self.assertAlmostEqual(1.74735178, q.lower["y"])
 
+    def test_calc_offsets_matches_calc_offset(self):
+        indices = np.array([-2, -1, 0, 1, 2, 17, 2**27, 2**28 + 3, 2**40 + 5,
+                            2**62, -2**40], dtype=np.int64)
+        for seed in [0, 1, 5025, 2**20 + 7, -3]:
+            for axis in ["x", "y", ""]:
+                m = RandomOffsetMutator(seed, [axis], [0.25])
+                expected = [m.calc_offset(axis, np.array([i], dtype=np.int64)[0])
+                            for i in indices]
+                self.assertEqual(expected, m.calc_offsets(axis, indices).tolist())
+
+    def test_mutate_points_matches_point(self):
+        g = CompoundGenerator([LineGenerator("y", "mm", 0, 4, 3),
+                               LineGenerator("x", "mm", 0, 4, 5, True)],
+                              [], [RandomOffsetMutator(3, ["x", "y"], [0.1, 0.25])])
+        g.prepare()
+        scattered = [14, 3, 0, 7, 8, 2]
+        for indices, points in [(range_(2, 13), g.get_points(2, 13)),
+                                (range_(12, 2, -1), g.get_points(12, 2)),
+                                (scattered, g.get_points_at(scattered))]:
+            for i, n in enumerate(indices):
+                point = g.get_point(n)
+                for axis in ["x", "y"]:
+                    self.assertEqual(point.positions[axis], points.positions[axis][i])
+                    self.assertEqual(point.lower[axis], points.lower[axis][i])
+                    self.assertEqual(point.upper[axis], points.upper[axis][i])
+
 class TestSerialisation(unittest.TestCase):
 
     def setUp(self):
@@ -49,6 +49,23 @@ class ContainsPointTest(unittest.TestCase):
         self.assertEqual(expected, mask.tolist())
         self.assertEqual(points_cp, [axis.tolist() for axis in points])
 
+    def test_mask_intervals_matches_mask_points(self):
+        # points on the boundary of a 3-4-5 triangle are exactly in the circle
+        roi = CircularROI([1, -1], 5)
+        for axis in [0, 1]:
+            line = np.linspace(-6, 8, 15)
+            other = np.linspace(-7, 5, 25)
+            points = [None, None]
+            points[axis], points[1 - axis] = line, other
+            starts, stops = roi.mask_intervals(points, axis)
+            grid = [None, None]
+            grid[axis] = np.tile(line, len(other))
+            grid[1 - axis] = np.repeat(other, len(line))
+            expected = roi.mask_points(grid).reshape(len(other), len(line))
+            idx = np.arange(len(line))
+            actual = (idx >= starts[:, np.newaxis]) & (idx < stops[:, np.newaxis])
+            self.assertEqual(expected.tolist(), actual.tolist())
+
 
 class DictTest(unittest.TestCase):
 
@@ -64,6 +64,26 @@ class EllipticalROITest(unittest.TestCase):
         self.assertEquals(expected, roi.mask_points(points).tolist())
         self.assertEqual(points_cp, [axis.tolist() for axis in points])
 
+    def test_mask_intervals_matches_mask_points(self):
+        roi = EllipticalROI([1, 2], [4, 3])
+        for axis in [0, 1]:
+            line = np.linspace(-4, 6, 21)
+            other = np.linspace(-2, 6, 17)
+            points = [None, None]
+            points[axis], points[1 - axis] = line, other
+            starts, stops = roi.mask_intervals(points, axis)
+            grid = [None, None]
+            grid[axis] = np.tile(line, len(other))
+            grid[1 - axis] = np.repeat(other, len(line))
+            expected = roi.mask_points(grid).reshape(len(other), len(line))
+            idx = np.arange(len(line))
+            actual = (idx >= starts[:, np.newaxis]) & (idx < stops[:, np.newaxis])
+            self.assertEqual(expected.tolist(), actual.tolist())
+
+    def test_mask_intervals_rotated_is_none(self):
+        roi = EllipticalROI([1, 2], [4, 3], pi/6)
+        self.assertIsNone(roi.mask_intervals([np.zeros(3), np.zeros(2)], 0))
+
     def test_to_dict(self):
         roi = EllipticalROI([1.1, 2.2], [3.3, 4.4], pi/4)
         expected = {
@@ -47,6 +47,13 @@ class PointROITest(unittest.TestCase):
         self.assertEqual(expected, mask.tolist())
         self.assertEqual(points_cp, [axis.tolist() for axis in p])
 
+    def test_mask_axes(self):
+        roi = PointROI([1, 2])
+        mask_x, mask_y = roi.mask_axes(
+            [np.array([1, 0, 1+1e-15]), np.array([2+1e-15, 2])])
+        self.assertEqual([True, False, False], mask_x.tolist())
+        self.assertEqual([False, True], mask_y.tolist())
+
     def test_to_dict(self):
         roi = PointROI([1.1, 2.2])
         expected = {
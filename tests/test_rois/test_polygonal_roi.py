@@ -3,6 +3,8 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 import unittest
 
+from mock import patch
+
 from test_util import ScanPointGeneratorTest
 from scanpointgenerator.rois.polygonal_roi import PolygonalROI
 from scanpointgenerator.compat import np
@@ -95,5 +97,25 @@ class PolygonalROITests(unittest.TestCase):
         self.assertEquals(expected, mask.tolist())
         self.assertEqual(points_cp, [axis.tolist() for axis in p])
 
+    @patch("scanpointgenerator.rois.polygonal_roi.SCANLINE_MIN_VERTICES", 3)
+    def test_complex_mask_scanlines(self):
+        self.test_complex_mask_points()
+        self.test_simple_point_contains()
+
+    @patch("scanpointgenerator.rois.polygonal_roi.SCANLINE_BLOCK_SIZE", 7)
+    def test_many_vertices_mask_points(self):
+        # star with vertices on the grid lines, so points lie on vertices
+        # and on horizontal edges
+        angles = np.linspace(0, 2 * np.pi, 40, endpoint=False)
+        radii = np.where(np.arange(40) % 2, 2, 4)
+        vertices_x = np.round(radii * np.cos(angles)).tolist()
+        vertices_y = np.round(radii * np.sin(angles)).tolist()
+        roi = PolygonalROI(vertices_x, vertices_y)
+        px = np.repeat(np.linspace(-5, 5, 41), 41)
+        py = np.tile(np.linspace(-5, 5, 41), 41)
+        expected = [roi.contains_point([x, y]) for x, y in zip(px, py)]
+        mask = roi.mask_points([px, py])
+        self.assertEqual(expected, mask.astype(bool).tolist())
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -101,6 +101,21 @@ class ContainsPointTest(unittest.TestCase):
         self.assertEqual(expected, mask.tolist())
         self.assertEqual(points_cp, [axis.tolist() for axis in points])
 
+    def test_mask_axes_matches_mask_points(self):
+        roi = RectangularROI([-1, 0.5], 2.5, 1)
+        x = np.linspace(-2, 2, 9)
+        y = np.linspace(0, 2, 7)
+        mask_x, mask_y = roi.mask_axes([x, y])
+        xx, yy = np.meshgrid(x, y)
+        expected = roi.mask_points([xx.ravel(), yy.ravel()])
+        self.assertEqual(
+            expected.tolist(),
+            np.logical_and.outer(mask_y, mask_x).ravel().tolist())
+
+    def test_mask_axes_rotated_is_none(self):
+        roi = RectangularROI([1, 2], 1, 1, pi/4)
+        self.assertIsNone(roi.mask_axes([np.zeros(2), np.zeros(3)]))
+
 class DictTest(unittest.TestCase):
 
     def test_to_dict(self):